@@ -2,54 +2,98 @@
 
 import asyncio
 import json
+import logging
 import os
-from dataclasses import dataclass
-
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import partial
+from urllib.parse import quote_plus
+
+import orjson
 from browserbase import Browserbase
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 
-from stagehand import AsyncStagehand
+from stagehand import (
+    APIConnectionError,
+    AsyncStagehand,
+    InternalServerError,
+    RateLimitError,
+)
 
 # Load environment variables from .env file
 # Required: BROWSERBASE_API_KEY, BROWSERBASE_PROJECT_ID, MODEL_API_KEY
 load_dotenv()
 
+# Progress tracing goes to stderr via logging; the comparison table and JSON go to stdout
+logger = logging.getLogger(__name__)
+
+# Read credentials once at startup instead of on every country's session setup
+BROWSERBASE_API_KEY = os.environ.get("BROWSERBASE_API_KEY")
+BROWSERBASE_PROJECT_ID = os.environ.get("BROWSERBASE_PROJECT_ID")
+MODEL_API_KEY = os.environ.get("MODEL_API_KEY")
+
 
 # Schema for a single product with structured extraction fields
+# Every field is required so the model returns one complete JSON object per product
+# Field descriptions carry the per-field guidance, so the extract() instruction stays short
 class Product(BaseModel):
     """Schema for extracted product data from Amazon search results"""
 
-    name: str = Field(..., description="The full product title/name")
-    price: str = Field(
-        default="N/A",
-        description=(
-            "The product price including currency symbol (e.g., '$29.99', '29,99 EUR', "
-            "'29.99 GBP'). If no price is visible, return 'N/A'"
-        ),
-    )
-    rating: str = Field(default="N/A", description="The star rating (e.g., '4.5 out of 5 stars')")
-    reviews_count: str = Field(
-        default="N/A", description="The number of customer reviews (e.g., '1,234')"
-    )
-    product_url: str = Field(
-        default="N/A",
-        description="The full href URL link to the product detail page (starting with https:// or /dp/)",
-    )
+    name: str = Field(..., description="Full product title.")
+    price: str = Field(..., description="Price with currency symbol (e.g. '$29.99'), or 'N/A'.")
+    rating: str = Field(..., description="Star rating text (e.g. '4.5 out of 5 stars').")
+    reviews_count: str = Field(..., description="Number of reviews (e.g. '1,234').")
+    product_url: str = Field(..., description="Product page href (https:// or /dp/).")
 
 
 # Schema for extracting multiple products from search results
 class ProductsResult(BaseModel):
     """Schema for extracting multiple products from Amazon search results"""
 
-    products: list[Product] = Field(
-        default_factory=list, description="Array of products from search results"
-    )
+    products: list[Product] = Field(..., description="Products from the search results.")
+
+
+def dereference_schema(schema: dict) -> dict:
+    """Inline all $ref references in a JSON schema for Gemini compatibility.
+
+    Walks the schema iteratively and replaces $ref nodes in place, so subtrees
+    without references are left as-is instead of being copied.
+    """
+    defs = schema.pop("$defs", {})
+    if not defs:
+        return schema
+
+    def resolve(node):
+        while isinstance(node, dict) and "$ref" in node:
+            node = defs.get(node["$ref"].split("/")[-1], {})
+        return node
+
+    schema = resolve(schema)
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        children = node.items() if isinstance(node, dict) else enumerate(node)
+        for key, child in children:
+            resolved = resolve(child)
+            if resolved is not child:
+                node[key] = resolved
+            if isinstance(resolved, (dict, list)):
+                stack.append(resolved)
+
+    return schema
+
+
+# Flattened extraction schema that Gemini can understand (avoids $ref issues)
+# Built once at import time and shared by every country's extract() call
+PRODUCTS_SCHEMA = dereference_schema(ProductsResult.model_json_schema())
 
 
 # Country configuration with geolocation proxy settings
 # Each country routes traffic through its geographic location to see local pricing
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CountryConfig:
     name: str
     code: str
@@ -69,18 +113,175 @@ COUNTRIES: list[CountryConfig] = [
 ]
 
 
+# Cleaned product data extracted for one search result
+@dataclass(slots=True, frozen=True)
+class ProductRecord:
+    name: str
+    price: str
+    rating: str
+    reviews_count: str
+    product_url: str
+
+
 # Results structure for each country
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CountryResult:
     country: str
     country_code: str
     currency: str
-    products: list[dict]
+    products: list[ProductRecord]
     error: str | None = None
 
 
+# Base URL used for search navigation and for resolving relative product links
+AMAZON_BASE_URL = "https://www.amazon.com"
+
 # Initialize Browserbase SDK for session management with proxies
-bb = Browserbase(api_key=os.environ.get("BROWSERBASE_API_KEY"))
+bb = Browserbase(api_key=BROWSERBASE_API_KEY)
+
+# Shared AsyncStagehand client (v3 API) - its settings are identical for every country,
+# so one client serves all concurrent country sessions
+client = AsyncStagehand(
+    browserbase_api_key=BROWSERBASE_API_KEY,
+    browserbase_project_id=BROWSERBASE_PROJECT_ID,
+    model_api_key=MODEL_API_KEY,
+)
+
+
+# Cap on simultaneous Browserbase session-create requests
+# Tune this to your Browserbase plan's concurrent session limit
+MAX_CONCURRENT_SESSION_CREATES = 8
+
+# Dedicated worker pool for the blocking Browserbase SDK so session creation
+# doesn't compete with other asyncio.to_thread users for the default executor
+session_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SESSION_CREATES)
+session_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SESSION_CREATES)
+
+
+def validate_env() -> None:
+    """Validate required environment variables before starting.
+
+    Raises:
+        ValueError: If required environment variables are missing
+    """
+    if not BROWSERBASE_API_KEY:
+        raise ValueError("BROWSERBASE_API_KEY environment variable is required")
+    if not BROWSERBASE_PROJECT_ID:
+        raise ValueError("BROWSERBASE_PROJECT_ID environment variable is required")
+    if not MODEL_API_KEY:
+        raise ValueError("MODEL_API_KEY environment variable is required")
+
+
+# Errors worth retrying: network blips, timeouts, rate limits, and 5xx responses
+RETRYABLE_ERRORS = (APIConnectionError, InternalServerError, RateLimitError, TimeoutError)
+
+
+async def with_retries(make_call, attempts: int = 3, base_delay: float = 0.5):
+    """
+    Awaits an SDK call, retrying transient failures with exponential backoff.
+
+    Args:
+        make_call: Zero-argument callable returning a fresh awaitable for each attempt
+        attempts: Maximum number of attempts before giving up (default: 3)
+        base_delay: Delay in seconds before the first retry, doubled on each retry
+
+    Returns:
+        The result of the first successful call
+
+    Raises:
+        The last retryable error if every attempt fails; non-retryable errors immediately
+    """
+    for attempt in range(attempts):
+        try:
+            return await make_call()
+        except RETRYABLE_ERRORS as error:
+            if attempt == attempts - 1:
+                raise
+            delay = base_delay * 2**attempt + random.uniform(0, 0.1)
+            logger.warning("Transient error (%s), retrying in %.1fs...", error, delay)
+            await asyncio.sleep(delay)
+
+
+async def extract_products(stagehand_session, results_count: int) -> list[ProductRecord]:
+    """
+    Extracts all product fields from a loaded search results page in one extract() call.
+
+    The schema requires every product field, so the model returns a single complete
+    JSON object instead of needing follow-up calls to fill in missing values.
+
+    Args:
+        stagehand_session: Stagehand session whose page shows Amazon search results
+        results_count: Number of products to extract
+
+    Returns:
+        List of cleaned ProductRecords with absolute URLs and "N/A" placeholders
+    """
+    # Retry transient model/API errors so one hiccup doesn't waste the whole proxy session
+    extract_response = await with_retries(
+        lambda: stagehand_session.extract(
+            instruction=(
+                f"Extract the first {results_count} non-sponsored product listings. "
+                "Follow the schema field descriptions."
+            ),
+            schema=PRODUCTS_SCHEMA,
+        )
+    )
+
+    # Passing a schema makes Stagehand return a parsed dict; only fall back to
+    # parsing when the result comes back as a raw JSON string
+    extracted_data = extract_response.data.result
+    if isinstance(extracted_data, str):
+        extracted_data = orjson.loads(extracted_data)
+
+    products = extracted_data.get("products", [])
+
+    # Clean up products - ensure price is never null and URLs are absolute
+    cleaned_products = [
+        ProductRecord(
+            name=p.get("name", "Unknown"),
+            price=p.get("price") or "N/A",
+            rating=p.get("rating") or "N/A",
+            reviews_count=p.get("reviews_count") or "N/A",
+            product_url=(
+                AMAZON_BASE_URL + url
+                if (url := p.get("product_url") or "").startswith("/")
+                else url or "N/A"
+            ),
+        )
+        for p in products
+    ]
+
+    return cleaned_products
+
+
+async def create_proxy_session(geolocation: dict):
+    """
+    Creates a Browserbase session that routes traffic through the given geolocation.
+
+    Session creation is bounded by a semaphore so that adding more countries doesn't
+    flood the Browserbase API with simultaneous requests and trigger rate limiting.
+
+    Args:
+        geolocation: Browserbase proxy geolocation config (country and optional city)
+
+    Returns:
+        The created Browserbase session
+    """
+    async with session_semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            session_executor,
+            partial(
+                bb.sessions.create,
+                project_id=BROWSERBASE_PROJECT_ID,
+                proxies=[
+                    {
+                        "type": "browserbase",  # Use Browserbase's managed proxy infrastructure
+                        "geolocation": geolocation,
+                    }
+                ],
+            ),
+        )
 
 
 async def get_products_for_country(
@@ -102,7 +303,7 @@ async def get_products_for_country(
     Returns:
         CountryResult with extracted products or error information
     """
-    print(f'\n=== Searching Amazon for "{search_query}" in {country.name} ===')
+    logger.info('=== Searching Amazon for "%s" in %s ===', search_query, country.name)
 
     # Build geolocation config for proxy routing
     geolocation: dict = {"country": country.code}
@@ -111,127 +312,30 @@ async def get_products_for_country(
 
     # Create Browserbase session with geolocation proxy configuration
     # This ensures all browser traffic routes through the specified geographic location
-    print(f"Creating Browserbase session with {country.name} proxy...")
-    session = await asyncio.to_thread(
-        bb.sessions.create,
-        project_id=os.environ.get("BROWSERBASE_PROJECT_ID"),
-        proxies=[
-            {
-                "type": "browserbase",  # Use Browserbase's managed proxy infrastructure
-                "geolocation": geolocation,
-            }
-        ],
-    )
+    logger.info("Creating Browserbase session with %s proxy...", country.name)
+    session = await create_proxy_session(geolocation)
     session_id = session.id
-    print(f"Session created: https://browserbase.com/sessions/{session_id}")
-
-    # Initialize AsyncStagehand client (v3 API)
-    client = AsyncStagehand(
-        browserbase_api_key=os.environ.get("BROWSERBASE_API_KEY"),
-        browserbase_project_id=os.environ.get("BROWSERBASE_PROJECT_ID"),
-        model_api_key=os.environ.get("MODEL_API_KEY"),
-    )
+    logger.info("Session created: https://browserbase.com/sessions/%s", session_id)
 
     try:
         # Start Stagehand session connected to our proxy-enabled Browserbase session
-        print(f"[{country.name}] Initializing Stagehand session...")
+        logger.info("[%s] Initializing Stagehand session...", country.name)
         stagehand_session = await client.sessions.create(
             model_name="google/gemini-2.5-flash",
             browserbase_session_id=session_id,  # Connect to existing proxy session
         )
 
-        # Navigate to Amazon homepage to begin search
-        print(f"[{country.name}] Navigating to Amazon...")
-        await stagehand_session.navigate(url="https://www.amazon.com")
-
-        # Perform search using natural language actions
-        print(f"[{country.name}] Searching for: {search_query}")
-        await stagehand_session.act(input=f'Type "{search_query}" into the search bar')
-        await stagehand_session.act(input="Click the search button")
-
-        # Wait for search results to load
-        await asyncio.sleep(2)
+        # Going straight to the results page skips two act() LLM round-trips per country
+        search_url = f"{AMAZON_BASE_URL}/s?k={quote_plus(search_query)}"
+        logger.info("[%s] Navigating to: %s", country.name, search_url)
+        await stagehand_session.navigate(url=search_url)
 
         # Extract products from search results using Stagehand's structured extraction
-        print(f"[{country.name}] Extracting top {results_count} products...")
-
-        # Use a flattened schema that Gemini can understand (avoids $ref issues)
-        products_schema = {
-            "type": "object",
-            "properties": {
-                "products": {
-                    "type": "array",
-                    "description": "Array of products from search results",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "name": {
-                                "type": "string",
-                                "description": "The full product title/name",
-                            },
-                            "price": {
-                                "type": "string",
-                                "description": "The product price including currency symbol (e.g., '$29.99'). If no price is visible, return 'N/A'",
-                            },
-                            "rating": {
-                                "type": "string",
-                                "description": "The star rating (e.g., '4.5 out of 5 stars')",
-                            },
-                            "reviews_count": {
-                                "type": "string",
-                                "description": "The number of customer reviews (e.g., '1,234')",
-                            },
-                            "product_url": {
-                                "type": "string",
-                                "description": "The full href URL link to the product detail page",
-                            },
-                        },
-                        "required": ["name"],
-                    },
-                }
-            },
-            "required": ["products"],
-        }
-
-        extract_response = await stagehand_session.extract(
-            instruction=f"""Extract the first {results_count} product search results from this Amazon page. For each product, extract:
-            1. name: the full product title
-            2. price: the displayed price WITH currency symbol (like $599.99 or 599,99 EUR). If no price shown, use "N/A"
-            3. rating: the star rating text (like "4.5 out of 5 stars")
-            4. reviews_count: the number of reviews (like "2,508")
-            5. product_url: the href link to the product page (starts with /dp/ or https://)
+        logger.info("[%s] Extracting top %d products...", country.name, results_count)
 
-            Only extract actual product listings, skip sponsored ads or recommendations.""",
-            schema=products_schema,
-        )
+        cleaned_products = await extract_products(stagehand_session, results_count)
 
-        # Parse the extracted data
-        extracted_data = extract_response.data.result
-        if isinstance(extracted_data, str):
-            extracted_data = json.loads(extracted_data)
-
-        products = extracted_data.get("products", [])
-
-        # Clean up products - ensure price is never null and URLs are absolute
-        cleaned_products = []
-        for p in products:
-            product_url = p.get("product_url", "N/A")
-            if product_url and product_url.startswith("/"):
-                product_url = f"https://www.amazon.com{product_url}"
-            elif not product_url:
-                product_url = "N/A"
-
-            cleaned_products.append(
-                {
-                    "name": p.get("name", "Unknown"),
-                    "price": p.get("price") or "N/A",
-                    "rating": p.get("rating") or "N/A",
-                    "reviews_count": p.get("reviews_count") or "N/A",
-                    "product_url": product_url,
-                }
-            )
-
-        print(f"Found {len(cleaned_products)} products in {country.name}")
+        logger.info("Found %d products in %s", len(cleaned_products), country.name)
 
         # End the Stagehand session
         await stagehand_session.end()
@@ -244,7 +348,7 @@ async def get_products_for_country(
         )
 
     except Exception as error:
-        print(f"Error fetching products from {country.name}: {error}")
+        logger.error("Error fetching products from %s: %s", country.name, error)
 
         return CountryResult(
             country=country.name,
@@ -255,6 +359,31 @@ async def get_products_for_country(
         )
 
 
+# Row layout for one country's price in the comparison table
+ROW_TEMPLATE = "  {country} | {price:<18} | {rating:<6} stars | {reviews} reviews"
+
+
+def display_country_summary(result: CountryResult) -> None:
+    """
+    Logs a one-line summary for a single country as soon as its results arrive.
+
+    Args:
+        result: CountryResult for the country that just finished
+    """
+    if result.error:
+        logger.info("[%s] Done - Error: %s", result.country, result.error)
+    elif result.products:
+        top_price = result.products[0].price
+        logger.info(
+            "[%s] Done - %d products, top result %s",
+            result.country,
+            len(result.products),
+            top_price,
+        )
+    else:
+        logger.info("[%s] Done - No products found", result.country)
+
+
 def display_comparison_table(results: list[CountryResult]) -> None:
     """
     Displays results in a formatted comparison table.
@@ -264,53 +393,58 @@ def display_comparison_table(results: list[CountryResult]) -> None:
     Args:
         results: List of CountryResult objects containing extracted product data
     """
-    print("\n" + "=" * 100)
-    print("PRICE COMPARISON ACROSS COUNTRIES")
-    print("=" * 100)
-
-    # Find the first successful result to get product count
-    successful_result = next((r for r in results if r.products), None)
-    if not successful_result:
-        print("No products found in any country.")
+    # Collect every line first and write the whole table to stdout in one call
+    lines = ["", "=" * 100, "PRICE COMPARISON ACROSS COUNTRIES", "=" * 100]
+
+    # Find the number of product positions to display in a single pass
+    max_products = 0
+    for r in results:
+        max_products = max(max_products, len(r.products))
+
+    if not max_products:
+        lines.append("No products found in any country.")
+        sys.stdout.write("\n".join(lines) + "\n")
         return
 
     # Display results for each product position
-    max_products = max(len(r.products) for r in results)
+
+    # Pad each country name once rather than once per product row
+    country_pads = [r.country.ljust(20) for r in results]
 
     for i in range(max_products):
-        print(f"\n--- Product {i + 1} ---")
+        lines += ["", f"--- Product {i + 1} ---"]
 
         # Find the first available product name for this position
         product_name = None
         for r in results:
             if i < len(r.products):
-                product_name = r.products[i].get("name")
+                product_name = r.products[i].name
                 break
 
         if product_name:
             truncated_name = product_name[:77] + "..." if len(product_name) > 80 else product_name
-            print(f"Product: {truncated_name}")
+            lines.append(f"Product: {truncated_name}")
 
-        print("\nPrices by Country:")
-        print("-" * 70)
+        lines += ["", "Prices by Country:", "-" * 70]
 
-        for result in results:
-            country_pad = result.country.ljust(20)
+        for result, country_pad in zip(results, country_pads, strict=True):
             if result.error:
-                print(f"  {country_pad} | Error: {result.error}")
+                lines.append(f"  {country_pad} | Error: {result.error}")
             elif i < len(result.products):
                 product = result.products[i]
-                price = product.get("price", "N/A")
-                price_pad = price.ljust(18)
-                rating = product.get("rating", "N/A")
-                rating_short = rating.split(" out")[0] if " out" in rating else rating
-                rating_pad = rating_short.ljust(6)
-                reviews = product.get("reviews_count", "N/A")
-                print(f"  {country_pad} | {price_pad} | {rating_pad} stars | {reviews} reviews")
+                lines.append(
+                    ROW_TEMPLATE.format(
+                        country=country_pad,
+                        price=product.price,
+                        rating=product.rating.partition(" out")[0],
+                        reviews=product.reviews_count,
+                    )
+                )
             else:
-                print(f"  {country_pad} | Not available in this country")
+                lines.append(f"  {country_pad} | Not available in this country")
 
-    print("\n" + "=" * 100)
+    lines += ["", "=" * 100]
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 async def main():
@@ -318,11 +452,18 @@ async def main():
     Main application entry point.
 
     Orchestrates the entire price comparison automation process:
-    1. Initializes configuration from environment variables
+    1. Validates configuration from environment variables
     2. Fetches products from Amazon for each country concurrently
     3. Displays formatted comparison table
     4. Outputs JSON results for programmatic use
     """
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+        stream=sys.stderr,
+    )
+    validate_env()
+
     # Configure search parameters
     search_query = "iPhone 15 Pro Max 256GB"
     results_count = 3
@@ -337,30 +478,38 @@ async def main():
 
     # Process all countries concurrently for faster execution
     # Each country uses its own browser session, so they can run in parallel
-    print(f"\nFetching prices from {len(COUNTRIES)} countries concurrently...")
+    logger.info("Fetching prices from %d countries concurrently...", len(COUNTRIES))
 
-    results = await asyncio.gather(
-        *[get_products_for_country(search_query, country, results_count) for country in COUNTRIES]
-    )
+    tasks = [
+        asyncio.create_task(get_products_for_country(search_query, country, results_count))
+        for country in COUNTRIES
+    ]
+
+    # Report each country as soon as it finishes instead of waiting for the slowest one
+    for completed in asyncio.as_completed(tasks):
+        display_country_summary(await completed)
+
+    # Collect results in COUNTRIES order for a stable comparison table
+    results = [task.result() for task in tasks]
 
     # Display formatted comparison table
-    display_comparison_table(list(results))
+    display_comparison_table(results)
 
     # Output JSON results for programmatic use
-    print("\n--- JSON OUTPUT ---")
+    sys.stdout.write("\n--- JSON OUTPUT ---\n")
     json_results = [
         {
             "country": r.country,
             "countryCode": r.country_code,
             "currency": r.currency,
-            "products": r.products,
+            "products": [asdict(p) for p in r.products],
             "error": r.error,
         }
         for r in results
     ]
-    print(json.dumps(json_results, indent=2))
+    sys.stdout.write(json.dumps(json_results, indent=2) + "\n")
 
-    print("\n=== Price comparison completed ===")
+    logger.info("=== Price comparison completed ===")
 
 
 if __name__ == "__main__":
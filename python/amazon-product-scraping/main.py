@@ -3,7 +3,11 @@
 
 import asyncio
 import json
+import logging
 import os
+import sys
+from functools import cache
+from urllib.parse import quote_plus
 
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
@@ -28,26 +32,48 @@ class ProductsList(BaseModel):
 
 
 def dereference_schema(schema: dict) -> dict:
-    """Inline all $ref references in a JSON schema for Gemini compatibility."""
+    """Inline all $ref references in a JSON schema for Gemini compatibility.
+
+    Walks the schema iteratively and replaces $ref nodes in place, so subtrees
+    without references are left as-is instead of being copied.
+    """
     defs = schema.pop("$defs", {})
+    if not defs:
+        return schema
+
+    def resolve(node):
+        while isinstance(node, dict) and "$ref" in node:
+            node = defs.get(node["$ref"].split("/")[-1], {})
+        return node
+
+    schema = resolve(schema)
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        children = node.items() if isinstance(node, dict) else enumerate(node)
+        for key, child in children:
+            resolved = resolve(child)
+            if resolved is not child:
+                node[key] = resolved
+            if isinstance(resolved, (dict, list)):
+                stack.append(resolved)
 
-    def resolve_refs(obj):
-        if isinstance(obj, dict):
-            if "$ref" in obj:
-                ref_path = obj["$ref"].split("/")[-1]
-                return resolve_refs(defs.get(ref_path, {}))
-            return {k: resolve_refs(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [resolve_refs(item) for item in obj]
-        return obj
+    return schema
 
-    return resolve_refs(schema)
+
+@cache
+def schema_for_model(model_cls: type[BaseModel]) -> dict:
+    """Return the flattened JSON schema for a pydantic model, built once per model class."""
+    return dereference_schema(model_cls.model_json_schema())
 
 
 # Load environment variables from .env file
 # Required: BROWSERBASE_API_KEY, BROWSERBASE_PROJECT_ID, MODEL_API_KEY (or GOOGLE_API_KEY)
 load_dotenv()
 
+# Progress tracing goes to stderr via logging; the extracted JSON goes to stdout
+logger = logging.getLogger(__name__)
+
 # ============= CONFIGURATION =============
 # Update this value to search for different products
 SEARCH_QUERY = "Seiko 5"
@@ -64,7 +90,12 @@ async def main():
     3. Extracts structured product data (name, price, rating, reviews, URL)
     4. Outputs results as JSON
     """
-    print("Starting Amazon Product Scraping...")
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+        stream=sys.stderr,
+    )
+    logger.info("Starting Amazon Product Scraping...")
 
     # Initialize AsyncStagehand client (v3 BYOB architecture)
     # Uses environment variables: BROWSERBASE_API_KEY, BROWSERBASE_PROJECT_ID, MODEL_API_KEY
@@ -77,29 +108,18 @@ async def main():
     # Start a Stagehand session with the specified model
     start_response = await client.sessions.start(model_name="google/gemini-2.5-flash")
     session_id = start_response.data.session_id
-    print("Stagehand initialized successfully!")
-    print(f"Live View Link: https://browserbase.com/sessions/{session_id}")
+    logger.info("Stagehand initialized successfully!")
+    logger.info("Live View Link: https://browserbase.com/sessions/%s", session_id)
 
     try:
-        # Alternative: skip the search bar and go straight to results by building the search URL.
-        # Uncomment below to use direct navigation instead of stagehand act() typing + clicking.
-        # from urllib.parse import quote_plus
-        # encoded_query = quote_plus(SEARCH_QUERY)
-        # search_url = f"https://www.amazon.com/s?k={encoded_query}"
-        # print(f"Navigating to: {search_url}")
-        # await client.sessions.navigate(id=session_id, url=search_url)
-
-        # Navigate to Amazon homepage to begin search
-        print("Navigating to Amazon...")
-        await client.sessions.navigate(id=session_id, url="https://www.amazon.com")
-
-        # Perform search using natural language actions
-        print(f"Searching for: {SEARCH_QUERY}")
-        await client.sessions.act(id=session_id, input=f"Type {SEARCH_QUERY} into the search bar")
-        await client.sessions.act(id=session_id, input="Click the search button")
+        # Skip the search bar and go straight to results by building the search URL
+        # This avoids two act() LLM round-trips for typing + clicking
+        search_url = f"https://www.amazon.com/s?k={quote_plus(SEARCH_QUERY)}"
+        logger.info("Navigating to: %s", search_url)
+        await client.sessions.navigate(id=session_id, url=search_url)
 
         # Extract structured product data using JSON schema for type safety
-        print("Extracting product data...")
+        logger.info("Extracting product data...")
         extract_response = await client.sessions.extract(
             id=session_id,
             instruction=(
@@ -107,22 +127,22 @@ async def main():
                 "Get the product name, price, star rating, number of reviews, "
                 "and the URL link to the product page."
             ),
-            schema=dereference_schema(ProductsList.model_json_schema()),
+            schema=schema_for_model(ProductsList),
         )
 
         # Display extracted products as formatted JSON
         products = extract_response.data.result
-        print("Products found:")
-        print(json.dumps(products, indent=2))
+        logger.info("Products found:")
+        sys.stdout.write(json.dumps(products, indent=2) + "\n")
 
     except Exception as error:
-        print(f"Error during product scraping: {error}")
+        logger.error("Error during product scraping: %s", error)
         raise
 
     finally:
         # Always close session to release resources and clean up
         await client.sessions.end(id=session_id)
-        print("Session closed successfully")
+        logger.info("Session closed successfully")
 
 
 if __name__ == "__main__":
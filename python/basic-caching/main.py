@@ -1,66 +1,196 @@
 # Stagehand + Browserbase: Basic Caching - See README.md for full documentation
 
-import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import singledispatch
+from hashlib import blake2b
 from pathlib import Path
 from typing import Any
 
+import orjson
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
+from pydantic import BaseModel
 
 from stagehand import Stagehand
 
 # Load environment variables
 load_dotenv()
 
+# Workflow actions as (cache key, prompt) pairs, built once and shared by both runs
+# The View Demo click must run first; the form fields are independent of each other
+DEMO_ACTION = ("Click on the View Demo button", "Click on the View Demo button")
+FORM_ACTIONS = (
+    (
+        "Type 'test@example.com' into the email field",
+        "Type 'test@example.com' into the email field",
+    ),
+    (
+        "Type '4242424242424242' into the card number field",
+        "Type '4242424242424242' into the card number field",
+    ),
+    (
+        "Type '12/34' into the expiration date field",
+        "Type '12/34' into the expiration date field",
+    ),
+)
+ACTIONS = (DEMO_ACTION, *FORM_ACTIONS)
+
 # Cache file location - stores observed actions for reuse
-CACHE_FILE = Path(__file__).parent / "cache.json"
+# JSON Lines format: each set_cache call appends one {"key", "prompt", "value"} record,
+# where "key" is a hash of the instruction and "prompt" is kept only for readability
+CACHE_FILE = Path(__file__).parent / "cache.jsonl"
+
+# In-memory copy of the cache file (hashed key -> record), loaded on first access
+# and kept in sync by set_cache
+_cache: dict[str, dict[str, Any]] | None = None
+# Guards the in-memory cache and pending writes when actions are cached from several threads
+_cache_lock = threading.Lock()
+# Number of records currently in the cache file, used to skip needless compaction
+_file_records = 0
+# Records cached during this run that haven't been written yet - flush_cache() appends
+# them in one write at the end of the run instead of one write per set_cache call
+_pending_lines: list[bytes] = []
+
+
+def cache_key(prompt: str) -> str:
+    """Short fixed-size cache key for an instruction (BLAKE2b, 32 hex chars)"""
+    return blake2b(prompt.encode(), digest_size=16).hexdigest()
+
+
+def load_cache() -> dict[str, dict[str, Any]]:
+    """Load the cache file into memory on first call and return the in-memory dict"""
+    global _cache, _file_records
+    if _cache is not None:
+        # Fast path: already loaded, no file access or locking needed
+        return _cache
+
+    with _cache_lock:
+        if _cache is None:
+            cache: dict[str, dict[str, Any]] = {}
+            records = 0
+            try:
+                with open(CACHE_FILE, "rb") as f:
+                    for line in f:
+                        try:
+                            record = orjson.loads(line)
+                        except orjson.JSONDecodeError:
+                            # Skip a partially written or corrupt line
+                            continue
+                        # Later records overwrite earlier ones for the same key
+                        cache[record["key"]] = record
+                        records += 1
+            except FileNotFoundError:
+                # Cache file doesn't exist yet - start with empty cache
+                pass
+            _cache = cache
+            _file_records = records
+    return _cache
+
+
+@singledispatch
+def to_serializable(value: Any) -> Any:
+    """Convert a value to JSON-serializable data - dispatched on the value's type"""
+    if hasattr(value, "dict"):
+        # Pydantic v1
+        return value.dict()
+    # Fallback: try to convert to dict
+    return dict(value) if hasattr(value, "__dict__") else value
+
+
+@to_serializable.register
+def _(value: BaseModel) -> Any:
+    # Pydantic v2 (ObserveResult)
+    return value.model_dump()
+
+
+@to_serializable.register
+def _(value: dict) -> Any:
+    return value
 
 
 def get_cache(key: str) -> dict[str, Any] | None:
     """Get the cached value (None if it doesn't exist)"""
-    try:
-        with open(CACHE_FILE) as f:
-            cache_content = f.read()
-            parsed = json.loads(cache_content)
-            return parsed.get(key)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Cache file doesn't exist or is invalid - return None
-        return None
+    record = load_cache().get(cache_key(key))
+    return record["value"] if record else None
 
 
 def set_cache(key: str, value: Any) -> None:
     """Set the cache value - converts ObserveResult (Pydantic model) to dict if needed"""
-    try:
-        # Read existing cache file to preserve other cached entries
-        with open(CACHE_FILE) as f:
-            cache_content = f.read()
-            parsed = json.loads(cache_content)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Cache file doesn't exist - start with empty dict
-        parsed = {}
-
-    # Convert ObserveResult (Pydantic BaseModel) to dict for JSON serialization
-    # Supports both Pydantic v1 and v2 for compatibility
-    if hasattr(value, "model_dump"):
-        # Pydantic v2
-        parsed[key] = value.model_dump()
-    elif hasattr(value, "dict"):
-        # Pydantic v1
-        parsed[key] = value.dict()
-    elif isinstance(value, dict):
-        parsed[key] = value
-    else:
-        # Fallback: try to convert to dict
-        parsed[key] = dict(value) if hasattr(value, "__dict__") else value
+    # Convert ObserveResult (Pydantic BaseModel) to dict for JSON serialization (orjson)
+    serialized = to_serializable(value)
+
+    cache = load_cache()
+    hashed_key = cache_key(key)
+    record = {"key": hashed_key, "prompt": key, "value": serialized}
+    line = orjson.dumps(record, default=str) + b"\n"
+
+    # Update memory now and queue the record; the file is written once by flush_cache()
+    with _cache_lock:
+        cache[hashed_key] = record
+        _pending_lines.append(line)
+
+
+def flush_cache() -> None:
+    """Append every record queued by set_cache to the cache file in a single write"""
+    global _file_records
+    with _cache_lock:
+        # Nothing cached this run - skip touching the file
+        if not _pending_lines:
+            return
+        with open(CACHE_FILE, "ab") as f:
+            f.write(b"".join(_pending_lines))
+        _file_records += len(_pending_lines)
+        _pending_lines.clear()
+
+
+def compact_cache() -> None:
+    """Rewrite the cache file with one record per key, dropping superseded records"""
+    global _file_records
+    cache = load_cache()
+    with _cache_lock:
+        # Nothing to drop - skip rewriting the file
+        if _file_records <= len(cache):
+            return
+        with open(CACHE_FILE, "wb") as f:
+            f.writelines(orjson.dumps(record, default=str) + b"\n" for record in cache.values())
+        _file_records = len(cache)
+
+
+def warm_cache(client, session_id: str, actions: tuple[tuple[str, str], ...]) -> int:
+    """
+    Observe every uncached action concurrently and store the results.
 
-    # Write updated cache back to file
-    with open(CACHE_FILE, "w") as f:
-        f.write(json.dumps(parsed, indent=2, default=str))
+    On a cold cache this overlaps the observe() LLM round-trips instead of paying
+    for them one after another. Only use it for actions whose elements are all
+    present on the current page.
+
+    Returns the number of observe() LLM calls made.
+    """
+    missing = [(key, prompt) for key, prompt in actions if not get_cache(key)]
+    if not missing:
+        return 0
+
+    print(f"  → Observing {len(missing)} actions in parallel")
+    with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+        responses = list(
+            executor.map(
+                lambda prompt: client.sessions.observe(id=session_id, instruction=prompt),
+                [prompt for _, prompt in missing],
+            )
+        )
 
+    for (key, prompt), observe_response in zip(missing, responses, strict=True):
+        action = observe_response.data.results[0] if observe_response.data.results else {}
+        set_cache(key, action)
+        print(f"  ✓ Cached action for: {prompt}")
 
-def act_with_cache(client, session_id: str, key: str, prompt: str, self_heal: bool = False):
+    return len(missing)
+
+
+def act_with_cache(client, session_id: str, key: str, prompt: str, self_heal: bool = False) -> bool:
     """
     Check the cache, get the action, and run it.
     If self_heal is true, we'll attempt to self-heal if the action fails.
@@ -70,7 +200,10 @@ def act_with_cache(client, session_id: str, key: str, prompt: str, self_heal: bo
     2. If not cached, observing the page to generate action (LLM call)
     3. Caching the observed action for future use
     4. Executing the action
+
+    Returns True if the action ran from cache without any LLM call.
     """
+    cache_hit = False
     try:
         # Check if action is already cached
         cache_exists = get_cache(key)
@@ -78,6 +211,7 @@ def act_with_cache(client, session_id: str, key: str, prompt: str, self_heal: bo
         if cache_exists:
             # Use the already-retrieved cached action - no LLM inference needed
             action = cache_exists
+            cache_hit = True
             print(f"  ✓ Cache hit for: {prompt}")
         else:
             # Get the observe result (the action) - this requires LLM inference
@@ -96,158 +230,100 @@ def act_with_cache(client, session_id: str, key: str, prompt: str, self_heal: bo
             client.sessions.act(id=session_id, input=action)
         else:
             client.sessions.act(id=session_id, input=prompt)
+            cache_hit = False
     except Exception as e:
         print(f"  ✗ Error: {e}")
         # In self_heal mode, retry the action with a fresh LLM call
         if self_heal:
             print("  → Attempting to self-heal...")
             client.sessions.act(id=session_id, input=prompt)
+            cache_hit = False
         else:
             raise e
 
+    return cache_hit
+
 
-def run_without_cache():
+def run_without_cache(client, session_id: str, page):
     """Run workflow without caching (baseline) - demonstrates normal LLM usage"""
     print("RUN 1: WITHOUT CACHING")
 
-    start_time = time.time()
-
-    # Initialize Stagehand with Browserbase for cloud-based browser automation
-    client = Stagehand(
-        browserbase_api_key=os.getenv("BROWSERBASE_API_KEY"),
-        browserbase_project_id=os.getenv("BROWSERBASE_PROJECT_ID"),
-        model_api_key=os.getenv("GOOGLE_API_KEY"),
-    )
-
-    start_response = client.sessions.start(model_name="google/gemini-2.5-flash")
-    session_id = start_response.data.session_id
-
-    try:
-        # Connect to the browser via CDP
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.connect_over_cdp(
-                f"wss://connect.browserbase.com?apiKey={os.environ['BROWSERBASE_API_KEY']}&sessionId={session_id}"
-            )
-            context = browser.contexts[0]
-            page = context.pages[0] if context.pages else context.new_page()
+    start_time = time.perf_counter()
 
-            # Navigate to Stripe checkout demo page
-            print("Navigating to Stripe checkout...")
-            page.goto("https://checkout.stripe.dev/preview", wait_until="domcontentloaded")
+    # Navigate to Stripe checkout demo page
+    print("Navigating to Stripe checkout...")
+    page.goto("https://checkout.stripe.dev/preview", wait_until="domcontentloaded")
 
-            # Each act() call requires LLM inference - no caching enabled
-            client.sessions.act(id=session_id, input="Click on the View Demo button")
-            client.sessions.act(id=session_id, input="Type 'test@example.com' into the email field")
-            client.sessions.act(
-                id=session_id, input="Type '4242424242424242' into the card number field"
-            )
-            client.sessions.act(id=session_id, input="Type '12/34' into the expiration date field")
+    # Each act() call requires LLM inference - no caching enabled
+    for _, prompt in ACTIONS:
+        client.sessions.act(id=session_id, input=prompt)
 
-            elapsed = f"{(time.time() - start_time):.2f}"
+    elapsed = f"{(time.perf_counter() - start_time):.2f}"
 
-            print(f"Total time: {elapsed}s")
-            print("Cost: ~$0.01-0.05 (4 LLM calls)")
-            print("API calls: 4 (one per action)\n")
+    print(f"Total time: {elapsed}s")
+    print(f"Cost: ~$0.01-0.05 ({len(ACTIONS)} LLM calls)")
+    print(f"API calls: {len(ACTIONS)} (one per action)\n")
 
-            browser.close()
+    return {"elapsed": elapsed, "llm_calls": len(ACTIONS)}
 
-        client.sessions.end(id=session_id)
-        return {"elapsed": elapsed, "llm_calls": 4}
-
-    except Exception as error:
-        print(f"Error: {error}")
-        client.sessions.end(id=session_id)
-        raise
 
+def run_with_cache(client, session_id: str, page, concurrent: bool = False):
+    """
+    Run workflow with caching enabled - demonstrates cost and latency savings
 
-def run_with_cache():
-    """Run workflow with caching enabled - demonstrates cost and latency savings"""
+    If concurrent is true, the independent form fields are filled in parallel
+    once their actions are cached, overlapping the act() round-trips. Observed
+    typing actions come back as fill(), which sets a field's value in one step,
+    so the fields don't interleave keystrokes. Pass False to fill them in order.
+    """
     print("RUN 2: WITH CACHING\n")
 
-    start_time = time.time()
-
-    # Initialize Stagehand with Browserbase for cloud-based browser automation
-    client = Stagehand(
-        browserbase_api_key=os.getenv("BROWSERBASE_API_KEY"),
-        browserbase_project_id=os.getenv("BROWSERBASE_PROJECT_ID"),
-        model_api_key=os.getenv("GOOGLE_API_KEY"),
-    )
-
-    start_response = client.sessions.start(model_name="google/gemini-2.5-flash")
-    session_id = start_response.data.session_id
-
-    try:
-        # Connect to the browser via CDP
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.connect_over_cdp(
-                f"wss://connect.browserbase.com?apiKey={os.environ['BROWSERBASE_API_KEY']}&sessionId={session_id}"
-            )
-            context = browser.contexts[0]
-            page = context.pages[0] if context.pages else context.new_page()
-
-            # Navigate to Stripe checkout demo page
-            print("Navigating to Stripe checkout...")
-            page.goto("https://checkout.stripe.dev/preview", wait_until="domcontentloaded")
-
-            # Use cached actions - first run will observe and cache, subsequent runs use cache
-            act_with_cache(
-                client, session_id, "Click on the View Demo button", "Click on the View Demo button"
-            )
-            act_with_cache(
-                client,
-                session_id,
-                "Type 'test@example.com' into the email field",
-                "Type 'test@example.com' into the email field",
-            )
-            act_with_cache(
-                client,
-                session_id,
-                "Type '4242424242424242' into the card number field",
-                "Type '4242424242424242' into the card number field",
-            )
-            act_with_cache(
-                client,
-                session_id,
-                "Type '12/34' into the expiration date field",
-                "Type '12/34' into the expiration date field",
+    start_time = time.perf_counter()
+
+    # Reload the checkout page to reset any state left by the previous run
+    print("Navigating to Stripe checkout...")
+    page.goto("https://checkout.stripe.dev/preview", wait_until="domcontentloaded")
+
+    # Use cached actions - first run will observe and cache, subsequent runs use cache
+    # Count LLM calls as we go instead of inferring them from the cache size afterwards
+    llm_calls = 0
+    if not act_with_cache(client, session_id, *DEMO_ACTION):
+        llm_calls += 1
+
+    # The form fields are all visible once the demo is open, so observe any
+    # uncached ones in parallel before running the actions in order
+    llm_calls += warm_cache(client, session_id, FORM_ACTIONS)
+    if concurrent:
+        with ThreadPoolExecutor(max_workers=len(FORM_ACTIONS)) as executor:
+            cache_hits = list(
+                executor.map(
+                    lambda action: act_with_cache(client, session_id, *action), FORM_ACTIONS
+                )
             )
+    else:
+        cache_hits = [
+            act_with_cache(client, session_id, key, prompt) for key, prompt in FORM_ACTIONS
+        ]
+    llm_calls += cache_hits.count(False)
 
-            elapsed = f"{(time.time() - start_time):.2f}"
-            cache_exists = CACHE_FILE.exists()
-
-            # Count cache entries to determine if this was a cache hit or miss
-            if cache_exists:
-                with open(CACHE_FILE) as f:
-                    cache_content = f.read()
-                    cache_data = json.loads(cache_content)
-                    cache_count = len(cache_data)
-            else:
-                cache_count = 0
-
-            print(f"\nTotal time: {elapsed}s")
-
-            # Display results based on cache status
-            if cache_count >= 4:
-                # Cache was used - no LLM calls made
-                print("Cost: $0.00 (cache hits, no LLM calls)")
-                print("API calls: 0 (all from cache)")
-                print(f"Cache entries: {cache_count}")
-            else:
-                # First run - cache was populated
-                print("💰Cost: ~$0.01-0.05 (first run, populated cache)")
-                print("📡API calls: 4 (saved to cache for next run)")
-                print("📂Cache created")
-            print()
+    elapsed = f"{(time.perf_counter() - start_time):.2f}"
 
-            browser.close()
+    print(f"\nTotal time: {elapsed}s")
 
-        client.sessions.end(id=session_id)
-        return {"elapsed": elapsed, "llm_calls": 0 if cache_count >= 4 else 4}
+    # Display results based on cache status
+    if llm_calls == 0:
+        # Cache was used - no LLM calls made
+        print("Cost: $0.00 (cache hits, no LLM calls)")
+        print("API calls: 0 (all from cache)")
+        print(f"Cache entries: {len(load_cache())}")
+    else:
+        # First run - cache was populated
+        print("💰Cost: ~$0.01-0.05 (first run, populated cache)")
+        print(f"📡API calls: {llm_calls} (saved to cache for next run)")
+        print("📂Cache created")
+    print()
 
-    except Exception as error:
-        print(f"Error: {error}")
-        client.sessions.end(id=session_id)
-        raise
+    return {"elapsed": elapsed, "llm_calls": llm_calls}
 
 
 def main():
@@ -266,15 +342,11 @@ def main():
 
     print("Run 'python main.py' twice to see the difference!\n")
 
+    # Load the cache once up front - every later lookup is served from memory
     # Check if cache exists to determine if this is first or subsequent run
-    cache_exists = CACHE_FILE.exists()
-
-    if cache_exists:
-        # Read cache file to count entries
-        with open(CACHE_FILE) as f:
-            cache_content = f.read()
-            cache_data = json.loads(cache_content)
-            cache_count = len(cache_data)
+    cache_count = len(load_cache())
+
+    if cache_count:
         print(f"📂 Cache found: {cache_count} entries")
         print("   This is a SUBSEQUENT run - cache will be used!\n")
     else:
@@ -282,9 +354,44 @@ def main():
 
     print("\nRunning comparison: without cache vs with cache...\n")
 
-    # Run both workflows for comparison
-    without_cache = run_without_cache()
-    with_cache = run_with_cache()
+    # Initialize Stagehand with Browserbase for cloud-based browser automation
+    # Both runs share this one session so session setup isn't paid twice
+    client = Stagehand(
+        browserbase_api_key=os.getenv("BROWSERBASE_API_KEY"),
+        browserbase_project_id=os.getenv("BROWSERBASE_PROJECT_ID"),
+        model_api_key=os.getenv("GOOGLE_API_KEY"),
+    )
+
+    start_response = client.sessions.start(model_name="google/gemini-2.5-flash")
+    session_id = start_response.data.session_id
+
+    try:
+        # Connect to the browser via CDP
+        with sync_playwright() as playwright:
+            browser = playwright.chromium.connect_over_cdp(
+                f"wss://connect.browserbase.com?apiKey={os.environ['BROWSERBASE_API_KEY']}&sessionId={session_id}"
+            )
+            context = browser.contexts[0]
+            page = context.pages[0] if context.pages else context.new_page()
+
+            # Run both workflows for comparison on the same page
+            without_cache = run_without_cache(client, session_id, page)
+            # The email, card number and expiry fields don't depend on each other,
+            # so the cached run fills them in parallel
+            with_cache = run_with_cache(client, session_id, page, concurrent=True)
+
+            browser.close()
+
+    except Exception as error:
+        print(f"Error: {error}")
+        raise
+
+    finally:
+        # Persist this run's new entries, then drop superseded records so the
+        # cache file stays one line per action
+        flush_cache()
+        compact_cache()
+        client.sessions.end(id=session_id)
 
     # Display comparison results
     print("\n=== Comparison ===")
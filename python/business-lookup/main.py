@@ -3,7 +3,10 @@
 import asyncio
 import json
 import os
+import sys
+from contextlib import asynccontextmanager, suppress
 
+import orjson
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 
@@ -12,118 +15,248 @@ from stagehand import Stagehand, StagehandConfig
 # Load environment variables
 load_dotenv()
 
+# Environment variables, read once at startup
+BROWSERBASE_API_KEY = os.environ.get("BROWSERBASE_API_KEY")
+BROWSERBASE_PROJECT_ID = os.environ.get("BROWSERBASE_PROJECT_ID")
+GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+
 # Business search variables
 business_name = "Jalebi Street"
 
+# Upper bound on concurrent lookups (and therefore open Browserbase sessions)
+MAX_CONCURRENT_LOOKUPS = 4
+
+# When stdout is piped it carries only NDJSON, so progress messages go to stderr
+PROGRESS_STREAM = sys.stdout if sys.stdout.isatty() else sys.stderr
+
+
+# Schema for the business details shown in the SF Business Registry
+# Defined at module level so Pydantic builds its validators once, not once per lookup
+class BusinessInfo(BaseModel):
+    dba_name: str = Field(..., description="DBA Name")
+    ownership_name: str | None = Field(None, description="Ownership Name")
+    business_account_number: str = Field(..., description="Business Account Number")
+    location_id: str | None = Field(None, description="Location Id")
+    street_address: str | None = Field(None, description="Street Address")
+    business_start_date: str | None = Field(None, description="Business Start Date")
+    business_end_date: str | None = Field(None, description="Business End Date")
+    neighborhood: str | None = Field(None, description="Neighborhood")
+    naics_code: str = Field(..., description="NAICS Code")
+    naics_code_description: str | None = Field(None, description="NAICS Code Description")
+
+
+def log(message: str) -> None:
+    """Print a progress or diagnostic message without mixing it into NDJSON output"""
+    print(message, file=PROGRESS_STREAM)
+
+
+def validate_env() -> None:
+    """Validate required environment variables before starting.
+
+    Raises:
+        ValueError: If required environment variables are missing
+    """
+    if not BROWSERBASE_API_KEY:
+        raise ValueError("BROWSERBASE_API_KEY environment variable is required")
+    if not BROWSERBASE_PROJECT_ID:
+        raise ValueError("BROWSERBASE_PROJECT_ID environment variable is required")
+    if not GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY environment variable is required")
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY environment variable is required")
+
+
+class StagehandPool:
+    """
+    Hands out initialized Stagehand sessions, reusing released ones.
+
+    Starting a Browserbase session costs a few seconds of handshakes, so when one
+    process runs several lookups it borrows a warm session instead of opening a new
+    one each time. Sessions are created lazily, at most `size` at a time.
+    """
+
+    def __init__(self, config: StagehandConfig, size: int = 4):
+        self._config = config
+        self._free: asyncio.Queue[Stagehand] = asyncio.Queue()
+        self._created: list[Stagehand] = []
+        # Bounds how many sessions can be checked out (and therefore created) at once
+        self._slots = asyncio.Semaphore(size)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a session for the duration of the `async with` block"""
+        async with self._slots:
+            try:
+                stagehand = self._free.get_nowait()
+            except asyncio.QueueEmpty:
+                # No idle session - start a new one
+                stagehand = Stagehand(self._config)
+                await stagehand.init()
+                self._created.append(stagehand)
+                log("Stagehand initialized successfully")
+                session_id = getattr(stagehand, "session_id", None) or getattr(
+                    stagehand, "browserbase_session_id", None
+                )
+                if session_id:
+                    log(f"Live View Link: https://browserbase.com/sessions/{session_id}")
+            try:
+                yield stagehand
+            except Exception:
+                # A failed lookup can leave the browser dead or half-navigated, so close
+                # the session instead of handing it to the next business
+                self._created.remove(stagehand)
+                with suppress(Exception):
+                    await stagehand.close()
+                raise
+            else:
+                self._free.put_nowait(stagehand)
+
+    async def close(self):
+        """Close every session the pool has started"""
+        # return_exceptions so one session failing to close doesn't leave the rest open
+        await asyncio.gather(
+            *(stagehand.close() for stagehand in self._created), return_exceptions=True
+        )
+        self._created.clear()
+
+
+async def lookup_business(name: str, pool: StagehandPool) -> BusinessInfo:
+    """
+    Look up one business in the SF Business Registry using a pooled session.
+
+    Args:
+        name: DBA name of the business to search for
+        pool: Pool to borrow a Stagehand session from
+
+    Returns:
+        BusinessInfo: The extracted business details
+    """
+    async with pool.acquire() as stagehand:
+        page = stagehand.page
 
-async def main():
-    print("Starting business lookup...")
+        # Navigate to SF Business Registry search page.
+        log(f"[{name}] Navigating to SF Business Registry...")
+        await page.goto(
+            "https://data.sfgov.org/stories/s/Registered-Business-Lookup/k6sk-2y6w/",
+            wait_until="domcontentloaded",
+            timeout=60000,
+        )
+
+        # Create agent with computer use capabilities for autonomous business search.
+        # Using CUA mode allows the agent to interact with complex UI elements like filters and tables.
+        log(f"[{name}] Creating Computer Use Agent...")
+        agent = stagehand.agent(
+            provider="google",
+            model="gemini-2.5-computer-use-preview-10-2025",
+            instructions="You are a helpful assistant that can use a web browser to search for business information.",
+            options={
+                "api_key": GOOGLE_API_KEY,
+            },
+        )
+
+        log(f"Searching for business: {name}")
+        result = await agent.execute(
+            instruction=f'Find and look up the business "{name}" in the SF Business Registry. Use the DBA Name filter to search for "{name}", apply the filter, and click on the business row to view detailed information. Scroll towards the right to see the NAICS code.',
+            max_steps=30,
+            auto_screenshot=True,
+        )
+
+        if not result.success:
+            raise Exception(f"Agent failed to complete the search for {name}")
+
+        log(f"[{name}] Agent completed search successfully")
+
+        # Extract comprehensive business information after agent completes the search.
+        # Using structured schema ensures consistent data extraction even if page layout changes.
+        log(f"[{name}] Extracting business information...")
+
+        return await page.extract(
+            "Extract all visible business information including DBA Name, Ownership Name, Business Account Number, Location Id, Street Address, Business Start Date, Business End Date, Neighborhood, NAICS Code, and NAICS Code Description",
+            schema=BusinessInfo,
+        )
+
+
+async def main(names: list[str] | None = None):
+    # Look up a single business by default; set BUSINESSES_JSON to a JSON list of names
+    # (e.g. '["Jalebi Street", "Tartine Bakery"]') to look up several in one run
+    if names is None:
+        names = json.loads(os.getenv("BUSINESSES_JSON", json.dumps([business_name])))
+
+    if not names:
+        log("No businesses to look up")
+        return
+
+    log(f"Starting business lookup for {len(names)} business(es)...")
+    validate_env()
 
     # Initialize Stagehand with Browserbase for cloud-based browser automation.
     # Note: set verbose: 0 to prevent API keys from appearing in logs when handling sensitive data.
     config = StagehandConfig(
         env="BROWSERBASE",
-        api_key=os.environ.get("BROWSERBASE_API_KEY"),
-        project_id=os.environ.get("BROWSERBASE_PROJECT_ID"),
+        api_key=BROWSERBASE_API_KEY,
+        project_id=BROWSERBASE_PROJECT_ID,
         model_name="openai/gpt-4.1",
-        model_api_key=os.environ.get("OPENAI_API_KEY"),
+        model_api_key=OPENAI_API_KEY,
         browserbase_session_create_params={
-            "project_id": os.environ.get("BROWSERBASE_PROJECT_ID"),
+            "project_id": BROWSERBASE_PROJECT_ID,
         },
         verbose=1,  # 0 = errors only, 1 = info, 2 = debug
         # (When handling sensitive data like passwords or API keys, set verbose: 0 to prevent secrets from appearing in logs.)
         # https://docs.stagehand.dev/configuration/logging
     )
 
+    # Sessions are borrowed from a pool so repeated lookups reuse a warm browser;
+    # the pool size also bounds how many lookups run at once
+    pool = StagehandPool(config, size=min(MAX_CONCURRENT_LOOKUPS, len(names)))
+
     try:
-        # Use async context manager for automatic resource management
-        async with Stagehand(config) as stagehand:
-            # Initialize browser session to start automation.
-            print("Stagehand initialized successfully")
-            session_id = None
-            if hasattr(stagehand, "session_id"):
-                session_id = stagehand.session_id
-            elif hasattr(stagehand, "browserbase_session_id"):
-                session_id = stagehand.browserbase_session_id
-
-            if session_id:
-                print(f"Live View Link: https://browserbase.com/sessions/{session_id}")
-
-            page = stagehand.page
-
-            # Navigate to SF Business Registry search page.
-            print("Navigating to SF Business Registry...")
-            await page.goto(
-                "https://data.sfgov.org/stories/s/Registered-Business-Lookup/k6sk-2y6w/",
-                wait_until="domcontentloaded",
-                timeout=60000,
-            )
+        # Fan out the lookups; gather() returns results in the same order as names.
+        # return_exceptions keeps one failed lookup from discarding the others
+        outcomes = await asyncio.gather(
+            *(lookup_business(name, pool) for name in names), return_exceptions=True
+        )
 
-            # Create agent with computer use capabilities for autonomous business search.
-            # Using CUA mode allows the agent to interact with complex UI elements like filters and tables.
-            print("Creating Computer Use Agent...")
-            agent = stagehand.agent(
-                provider="google",
-                model="gemini-2.5-computer-use-preview-10-2025",
-                instructions="You are a helpful assistant that can use a web browser to search for business information.",
-                options={
-                    "api_key": os.getenv("GOOGLE_API_KEY"),
-                },
-            )
+        results = []
+        for name, outcome in zip(names, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                log(f"[{name}] Lookup failed: {outcome}")
+            else:
+                results.append(outcome)
 
-            print(f"Searching for business: {business_name}")
-            result = await agent.execute(
-                instruction=f'Find and look up the business "{business_name}" in the SF Business Registry. Use the DBA Name filter to search for "{business_name}", apply the filter, and click on the business row to view detailed information. Scroll towards the right to see the NAICS code.',
-                max_steps=30,
-                auto_screenshot=True,
-            )
+        if not results:
+            raise Exception("Every business lookup failed")
 
-            if not result.success:
-                raise Exception("Agent failed to complete the search")
-
-            print("Agent completed search successfully")
-
-            # Extract comprehensive business information after agent completes the search.
-            # Using structured schema ensures consistent data extraction even if page layout changes.
-            print("Extracting business information...")
-
-            # Define schema using Pydantic
-            class BusinessInfo(BaseModel):
-                dba_name: str = Field(..., description="DBA Name")
-                ownership_name: str | None = Field(None, description="Ownership Name")
-                business_account_number: str = Field(..., description="Business Account Number")
-                location_id: str | None = Field(None, description="Location Id")
-                street_address: str | None = Field(None, description="Street Address")
-                business_start_date: str | None = Field(None, description="Business Start Date")
-                business_end_date: str | None = Field(None, description="Business End Date")
-                neighborhood: str | None = Field(None, description="Neighborhood")
-                naics_code: str = Field(..., description="NAICS Code")
-                naics_code_description: str | None = Field(
-                    None, description="NAICS Code Description"
-                )
-
-            business_info = await page.extract(
-                "Extract all visible business information including DBA Name, Ownership Name, Business Account Number, Location Id, Street Address, Business Start Date, Business End Date, Neighborhood, NAICS Code, and NAICS Code Description",
-                schema=BusinessInfo,
+        if sys.stdout.isatty():
+            # Pretty-print for people reading the terminal
+            for business_info in results:
+                print("Business information extracted:")
+                print(orjson.dumps(business_info.model_dump(), option=orjson.OPT_INDENT_2).decode())
+        else:
+            # Piped or redirected: emit NDJSON (one compact record per line) in a single write
+            sys.stdout.flush()
+            sys.stdout.buffer.writelines(
+                orjson.dumps(business_info.model_dump(), option=orjson.OPT_APPEND_NEWLINE)
+                for business_info in results
             )
-
-            print("Business information extracted:")
-            print(json.dumps(business_info.model_dump(), indent=2))
-
-        print("Session closed successfully")
+            sys.stdout.buffer.flush()
 
     except Exception as error:
-        print(f"Error during business lookup: {error}")
+        log(f"Error during business lookup: {error}")
         raise
 
+    finally:
+        await pool.close()
+        log("Session closed successfully")
+
 
 if __name__ == "__main__":
     try:
         asyncio.run(main())
     except Exception as err:
-        print(f"Error in business lookup: {err}")
-        print("Common issues:")
-        print("  - Check .env file has BROWSERBASE_PROJECT_ID and BROWSERBASE_API_KEY")
-        print("  - Verify GOOGLE_API_KEY is set for the agent")
-        print("Docs: https://docs.stagehand.dev/v3/first-steps/introduction")
+        log(f"Error in business lookup: {err}")
+        log("Common issues:")
+        log("  - Check .env file has BROWSERBASE_PROJECT_ID and BROWSERBASE_API_KEY")
+        log("  - Verify GOOGLE_API_KEY (agent) and OPENAI_API_KEY (extraction) are set")
+        log("Docs: https://docs.stagehand.dev/v3/first-steps/introduction")
         exit(1)
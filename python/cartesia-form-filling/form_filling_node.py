@@ -7,62 +7,140 @@ filling during conversation without blocking the voice flow.
 """
 
 import asyncio
+import functools
+import os
+from collections import deque
 from collections.abc import AsyncGenerator
 from dataclasses import dataclass
 
 from config import DEFAULT_MODEL_ID, DEFAULT_TEMPERATURE
 from google.genai import types as gemini_types
-from line.events import AgentResponse, EndCall, ToolResult
+from line.events import AgentResponse, EndCall, ToolResult, UserTranscriptionReceived
 from line.nodes.conversation_context import ConversationContext
 from line.nodes.reasoning import ReasoningNode
 from line.tools.system_tools import EndCallArgs, end_call
-from line.utils.gemini_utils import convert_messages_to_gemini
 from loguru import logger
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from stagehand_form_filler import StagehandFormFiller
 
 
 class RecordFormFieldArgs(BaseModel):
     """Arguments for recording a form field"""
 
+    model_config = ConfigDict(frozen=True)
+
     field_name: str = Field(description="The form field being filled")
     value: str = Field(description="The value to enter in the field")
 
 
+# Set FORM_NODE_DEBUG=1 to log per-turn diagnostics
+_DEBUG = os.getenv("FORM_NODE_DEBUG") == "1"
+
+# Stream text is held back until at least this many characters have arrived,
+# so downstream TTS gets a few larger AgentResponses instead of one per token
+_MIN_RESPONSE_CHUNK_CHARS = 64
+
+# Greeting spoken when the conversation starts, built once at import time
+_INITIAL_GREETING_RESPONSE = AgentResponse(
+    content=(
+        "Hello! I'm here to help you fill out an application "
+        "form today. I'll ask you a series of questions and "
+        "fill in the form as we go. Ready to get started?"
+    )
+)
+
+# Spoken while the form is submitted, before the final goodbye
+_SUBMITTING_RESPONSE = AgentResponse(
+    content="Thanks, that's everything I need. Give me a moment to submit your application."
+)
+
+# JSON schema for the tool arguments, generated once at import time
+_RECORD_FIELD_SCHEMA = RecordFormFieldArgs.model_json_schema()
+
+
 class RecordFormFieldTool:
     """Tool for recording form field values"""
 
-    @staticmethod
-    def name() -> str:
-        return "record_form_field"
-
-    @staticmethod
-    def description() -> str:
-        return "Record a value for a form field that needs to be filled"
+    NAME = "record_form_field"
+    DESCRIPTION = "Record a value for a form field that needs to be filled"
 
     @staticmethod
     def parameters() -> dict:
-        return RecordFormFieldArgs.model_json_schema()
+        return _RECORD_FIELD_SCHEMA
 
     @staticmethod
     def to_gemini_tool():
         """Convert to Gemini tool format.
 
         Returns:
-            A Gemini Tool object with function declarations.
+            A Gemini Tool object with function declarations, shared across calls.
         """
-        return gemini_types.Tool(
-            function_declarations=[
-                gemini_types.FunctionDeclaration(
-                    name=RecordFormFieldTool.name(),
-                    description=RecordFormFieldTool.description(),
-                    parameters=RecordFormFieldTool.parameters(),
-                )
-            ]
+        return _RECORD_FIELD_TOOL
+
+
+# Gemini tool declaration, built once at import time
+_RECORD_FIELD_TOOL = gemini_types.Tool(
+    function_declarations=[
+        gemini_types.FunctionDeclaration(
+            name=RecordFormFieldTool.NAME,
+            description=RecordFormFieldTool.DESCRIPTION,
+            parameters=RecordFormFieldTool.parameters(),
         )
+    ]
+)
+
+
+@functools.lru_cache(maxsize=32)
+def _build_question_context(field_name: str, question: str) -> str:
+    """Build the system instruction block describing the current question.
+
+    Cached, since every call asks the same small set of questions.
+
+    Args:
+        field_name: The form field the question fills.
+        question: The question asked to the user.
 
+    Returns:
+        The text appended to the system instruction while the question is asked.
+    """
+    return f"""
+
+        Current form field: {field_name}
+        Question: {question}
+
+        Listen to the user's response and use the record_form_field
+        tool to save it. Then acknowledge their answer naturally.
+        """
+
+
+# Gemini role for each event type that carries conversation text
+_GEMINI_ROLES = {AgentResponse: "model", UserTranscriptionReceived: "user"}
+
+
+def _events_to_gemini(events: list) -> list[gemini_types.Content]:
+    """Convert this node's text events to Gemini messages.
+
+    The node only ever sends agent responses and user transcripts to Gemini,
+    so this looks each event's role up by exact type and skips everything
+    else, instead of going through the generic converter.
+
+    Args:
+        events: Conversation events to convert.
+
+    Returns:
+        One Gemini Content per agent response or user transcript.
+    """
+    messages = []
+    for event in events:
+        role = _GEMINI_ROLES.get(type(event))
+        if role and event.content:
+            messages.append(
+                gemini_types.Content(role=role, parts=[gemini_types.Part(text=event.content)])
+            )
+    return messages
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class FormQuestion:
     """Represents a question to ask the user"""
 
@@ -115,11 +193,21 @@ class FormFillingNode(ReasoningNode):
         self.collected_data: dict[str, str] = {}
         # Pre-initialize questions so conversation can start immediately
         self.questions: list[FormQuestion] = self._create_questions()
+        # Index of the current question, which is also the number answered
         self.current_question_index = 0
+        self._q_iter = iter(self.questions)
+        self._current_question: FormQuestion | None = next(self._q_iter, None)
 
         # Browser initialization
         self.browser_init_task = None
         self.browser_initializing = False
+        # Set once initialization has finished, whether or not it succeeded
+        self._browser_ready = asyncio.Event()
+
+        # Recorded fields waiting to be filled, drained by a single worker so
+        # fills never race each other on the same page
+        self._fill_queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
+        self._fill_worker: asyncio.Task | None = None
 
         # Enhanced prompt for form filling
         enhanced_prompt = (
@@ -135,19 +223,52 @@ class FormFillingNode(ReasoningNode):
         """
         )
 
+        # Gemini tool declaration, built once and shared by every config
+        self._gemini_tool = RecordFormFieldTool.to_gemini_tool()
+
         # Generation config
         self.generation_config = gemini_types.GenerateContentConfig(
             system_instruction=enhanced_prompt,
             temperature=self.temperature,
-            tools=[RecordFormFieldTool.to_gemini_tool()],
+            tools=[self._gemini_tool],
             max_output_tokens=max_output_tokens,
             thinking_config=gemini_types.ThinkingConfig(thinking_budget=0),
         )
 
+        # Per-question generation configs, built once here instead of on every turn
+        self._configs: list[gemini_types.GenerateContentConfig] = [
+            self._create_question_config(question) for question in self.questions
+        ]
+
+        # Per-question request arguments, so each turn only adds the contents
+        self._request_templates: list[dict] = [
+            {"model": self.model_id, "config": config} for config in self._configs
+        ]
+
+        # Responses that ask each question, built once instead of per turn
+        self._begin_responses: list[AgentResponse] = [
+            AgentResponse(content=f"Great! Let's begin. {question.question}")
+            for question in self.questions
+        ]
+        self._next_responses: list[AgentResponse] = [
+            AgentResponse(content=f"Great! {question.question}") for question in self.questions
+        ]
+
         logger.info(f"FormFillingNode initialized for form: {form_url}")
 
         # Track if form was submitted
         self.form_submitted = False
+        self._submit_task: asyncio.Task | None = None
+
+        # Start the browser now so it warms up during the greeting instead of
+        # after the user's first reply
+        self._start_background_tasks()
+
+        # Rolling window of the most recent Gemini messages. Each turn only
+        # converts the events added since the last one, and the deque drops
+        # the oldest messages once the window is full
+        self._gemini_messages: deque = deque(maxlen=max_context_length)
+        self._last_event = None
 
     async def cleanup_and_submit(self) -> None:
         """Ensure form is submitted and cleanup when call ends.
@@ -155,6 +276,13 @@ class FormFillingNode(ReasoningNode):
         Returns:
             None.
         """
+        # Let a submission started by process_context finish before closing
+        if self._submit_task and not self._submit_task.done():
+            try:
+                await self._submit_task
+            except Exception as e:
+                logger.error(f"Error during form submission: {e}")
+
         # Submit form if we have any data and haven't submitted yet
         if not self.form_submitted and self.collected_data and self.stagehand_filler:
             logger.info("Call ending - auto-submitting form with collected data")
@@ -163,10 +291,35 @@ class FormFillingNode(ReasoningNode):
             except Exception as e:
                 logger.error(f"Error during cleanup submission: {e}")
 
+        # Stop the fill worker
+        if self._fill_worker:
+            self._fill_worker.cancel()
+
         # Clean up browser
         if self.stagehand_filler:
             await self.stagehand_filler.cleanup()
 
+    def _start_background_tasks(self) -> None:
+        """Start browser initialization and the fill worker if not yet started.
+
+        Needs a running event loop; when there isn't one yet, both are
+        started on the first call to process_context instead.
+
+        Returns:
+            None.
+        """
+        if self.browser_init_task or self.stagehand_filler:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        self.browser_init_task = loop.create_task(self._initialize_browser())
+        self._fill_worker = loop.create_task(self._drain_fill_queue())
+        logger.info("Browser initialization started in background")
+
     async def _initialize_browser(self) -> None:
         """Initialize browser and extract form fields.
 
@@ -187,11 +340,34 @@ class FormFillingNode(ReasoningNode):
             logger.info("Browser ready, form can now be filled")
 
         except Exception as e:
+            # Nothing awaits this task, so log instead of raising; fill_field
+            # retries initialization on the next fill
             logger.error(f"Failed to initialize browser: {e}")
-            self.browser_initializing = False
-            raise
         finally:
             self.browser_initializing = False
+            # Always release waiters, so a failed start can't hang fills or submit
+            self._browser_ready.set()
+
+    def _create_question_config(self, question: FormQuestion) -> gemini_types.GenerateContentConfig:
+        """Create the generation config used while asking a question.
+
+        Args:
+            question: The question being asked.
+
+        Returns:
+            The base generation config with context about the question added to
+            the system instruction.
+        """
+        # Add context about current question
+        question_context = _build_question_context(question.field_name, question.question)
+
+        return gemini_types.GenerateContentConfig(
+            system_instruction=(self.generation_config.system_instruction + question_context),
+            temperature=self.temperature,
+            tools=[self._gemini_tool],
+            max_output_tokens=self.generation_config.max_output_tokens,
+            thinking_config=gemini_types.ThinkingConfig(thinking_budget=0),
+        )
 
     def _create_questions(self) -> list[FormQuestion]:
         """Create questions for the form.
@@ -267,32 +443,60 @@ class FormFillingNode(ReasoningNode):
 
         return form_questions
 
-    async def _fill_form_field_async(self, field_name: str, value: str) -> None:
-        """Fill a form field asynchronously in background (non-blocking).
+    async def _drain_fill_queue(self) -> None:
+        """Fill recorded fields in the background, one batch at a time.
+
+        Waits for the next recorded field, then takes any others that queued
+        up behind it so they are filled together.
+
+        Returns:
+            None.
+        """
+        while True:
+            batch = [await self._fill_queue.get()]
+            while not self._fill_queue.empty():
+                batch.append(self._fill_queue.get_nowait())
+
+            try:
+                await self._fill_form_fields(batch)
+            finally:
+                for _ in batch:
+                    self._fill_queue.task_done()
+
+    async def _fill_form_fields(self, batch: list[tuple[str, str]]) -> None:
+        """Fill a batch of form fields in the browser.
 
         Args:
-            field_name: The name of the form field to fill.
-            value: The value to enter in the field.
+            batch: (field_name, value) pairs to fill, in the order recorded.
+
+        Returns:
+            None.
         """
+        field_names = ", ".join(field_name for field_name, _ in batch)
         try:
             # Wait for browser initialization if needed
-            if self.browser_init_task:
-                logger.info(f"Waiting for browser to initialize before filling {field_name}")
-                await self.browser_init_task
+            if self.browser_init_task and not self._browser_ready.is_set():
+                logger.info("Waiting for browser to initialize before filling {}", field_names)
+                await self._browser_ready.wait()
 
-            logger.info(f"Filling field '{field_name}' with: {value} in background")
-            # Use StagehandFormFiller's fill_field method which
+            if not self.stagehand_filler:
+                logger.warning("Browser unavailable, skipping fields: {}", field_names)
+                return
+
+            logger.info("Filling fields in background: {}", field_names)
+            # Use StagehandFormFiller's fill_fields method which
             # handles the mapping
-            success = await self.stagehand_filler.fill_field(field_name, value)
+            results = await self.stagehand_filler.fill_fields(batch)
 
-            if success:
-                logger.info(f"Successfully filled field: {field_name} in browser")
-            else:
-                logger.warning(f"Failed to fill field: {field_name}")
+            for (field_name, _), success in zip(batch, results, strict=True):
+                if success:
+                    logger.info("Successfully filled field: {} in browser", field_name)
+                else:
+                    logger.warning("Failed to fill field: {}", field_name)
 
         except Exception as e:
-            logger.error(f"Error filling field {field_name}: {e}")
-            raise  # Re-raise so background task can catch it
+            # Keep the worker alive so later fields still get a chance
+            logger.error("Error filling fields {}: {}", field_names, e)
 
     async def _submit_form(self) -> bool:
         """Submit the completed form.
@@ -301,13 +505,17 @@ class FormFillingNode(ReasoningNode):
             True if submission succeeded, False otherwise.
         """
         # Wait for browser initialization if needed
-        if self.browser_init_task and not self.stagehand_filler:
+        if self.browser_init_task and not self._browser_ready.is_set():
             logger.info("Waiting for browser to initialize before submitting form")
-            await self.browser_init_task
+            await self._browser_ready.wait()
 
         if not self.stagehand_filler:
             return False
 
+        # Let pending fills reach the page before clicking submit
+        if self._fill_worker and not self._fill_worker.done():
+            await self._fill_queue.join()
+
         try:
             logger.info("Submitting web form with collected data")
             logger.info(f"Data collected: {self.collected_data}")
@@ -332,15 +540,53 @@ class FormFillingNode(ReasoningNode):
             logger.error(f"Error submitting form: {e}")
             return False
 
+    def _get_gemini_messages(self, events: list) -> list:
+        """Convert conversation events to a rolling window of Gemini messages.
+
+        Only the events after the last one seen on the previous turn are
+        converted and appended to the window. If that event is no longer in
+        the list, the window is rebuilt from the events given.
+
+        Args:
+            events: The conversation events for this turn.
+
+        Returns:
+            The most recent Gemini messages, at most max_context_length of them.
+        """
+        start = 0
+        if self._last_event is not None:
+            # Scan from the end, since the last seen event is normally near it
+            for i in range(len(events) - 1, -1, -1):
+                if events[i] is self._last_event:
+                    start = i + 1
+                    break
+            else:
+                self._gemini_messages.clear()
+
+        new_events = events[start:]
+        if new_events:
+            self._gemini_messages.extend(_events_to_gemini(new_events))
+            self._last_event = events[-1]
+
+        return list(self._gemini_messages)
+
     def get_current_question(self) -> FormQuestion | None:
         """Get the current question to ask.
 
         Returns:
             The current FormQuestion or None if all questions answered.
         """
-        if self.current_question_index < len(self.questions):
-            return self.questions[self.current_question_index]
-        return None
+        return self._current_question
+
+    def _advance(self) -> None:
+        """Move on to the next question once the current one is answered.
+
+        The Gemini window is cleared too, so each question starts from a fresh
+        context instead of carrying the answers to earlier ones.
+        """
+        self._current_question = next(self._q_iter, None)
+        self.current_question_index += 1
+        self._gemini_messages.clear()
 
     async def process_context(
         self, context: ConversationContext
@@ -354,17 +600,20 @@ class FormFillingNode(ReasoningNode):
             AgentResponse: Text responses to the user.
             EndCall: Call termination when form is complete.
         """
-        # Initialize browser on first call (non-blocking)
-        if not self.browser_init_task and not self.stagehand_filler:
-            self.browser_init_task = asyncio.create_task(self._initialize_browser())
-            logger.info("Browser initialization started in background")
+        # Normally already started in __init__; this only covers nodes created
+        # outside a running event loop
+        self._start_background_tasks()
 
         # Get current question after initialization
         current_question = self.get_current_question()
-        question_name = current_question.field_name if current_question else "None"
-        logger.info(f"Current question: {question_name}")
-        logger.info(f"Question index: {self.current_question_index}/{len(self.questions)}")
-        logger.info(f"Events count: {len(context.events)}")
+        if _DEBUG:
+            logger.info(
+                "Turn: question={} index={}/{} events={}",
+                current_question.field_name if current_question else "None",
+                self.current_question_index,
+                len(self.questions),
+                len(context.events),
+            )
 
         # Check latest event to determine what to do
         latest_event = context.events[-1] if context.events else None
@@ -373,12 +622,7 @@ class FormFillingNode(ReasoningNode):
         # Handle initial greeting - speak first when conversation starts
         if not context.events:
             logger.info("Starting conversation - Agent speaks first")
-            initial_greeting = (
-                "Hello! I'm here to help you fill out an application "
-                "form today. I'll ask you a series of questions and "
-                "fill in the form as we go. Ready to get started?"
-            )
-            yield AgentResponse(content=initial_greeting)
+            yield _INITIAL_GREETING_RESPONSE
             return
 
         # If last event was our greeting, and user responded, ask
@@ -386,9 +630,9 @@ class FormFillingNode(ReasoningNode):
         if len(context.events) == 2 and not is_agent_response and self.current_question_index == 0:
             user_message = context.get_latest_user_transcript_message()
             if user_message and current_question:
-                logger.info(f"User ready to start: '{user_message}'")
-                logger.info(f"Asking first question: {current_question.field_name}")
-                yield AgentResponse(content=f"Great! Let's begin. {current_question.question}")
+                logger.info("User ready to start: '{}'", user_message)
+                logger.info("Asking first question: {}", current_question.field_name)
+                yield self._begin_responses[self.current_question_index]
                 return
 
         # Check if all questions have been answered
@@ -399,11 +643,15 @@ class FormFillingNode(ReasoningNode):
             and len(self.collected_data) > 0
         ):
             # All questions answered - submit the form
-            logger.info(f"All {self.current_question_index} questions answered")
-            logger.info(f"Collected data for {len(self.collected_data)} fields")
+            logger.info("All {} questions answered", self.current_question_index)
+            logger.info("Collected data for {} fields", len(self.collected_data))
 
-            submission_success = await self._submit_form()
+            # Submit in the background while the wrap-up line is spoken
+            self._submit_task = asyncio.create_task(self._submit_form())
             self.form_submitted = True
+            yield _SUBMITTING_RESPONSE
+
+            submission_success = await self._submit_task
 
             if submission_success:
                 goodbye = "Perfect! I've submitted your application. Thank you!"
@@ -425,79 +673,86 @@ class FormFillingNode(ReasoningNode):
             return
 
         # Process user response
-        messages = convert_messages_to_gemini(context.events, text_events_only=True)
-
-        # Add context about current question
-        question_context = f"""
+        messages = self._get_gemini_messages(context.events)
 
-        Current form field: {current_question.field_name}
-        Question: {current_question.question}
+        # Use the precomputed request arguments for the current question
+        request_template = self._request_templates[self.current_question_index]
 
-        Listen to the user's response and use the record_form_field
-        tool to save it. Then acknowledge their answer naturally.
-        """
-
-        enhanced_config = gemini_types.GenerateContentConfig(
-            system_instruction=(self.generation_config.system_instruction + question_context),
-            temperature=self.temperature,
-            tools=[RecordFormFieldTool.to_gemini_tool()],
-            max_output_tokens=self.generation_config.max_output_tokens,
-            thinking_config=gemini_types.ThinkingConfig(thinking_budget=0),
-        )
-
-        # Get user's latest message
-        user_message = context.get_latest_user_transcript_message()
-        if user_message:
-            logger.info(f'User response: "{user_message}"')
+        # Log user's latest message
+        if _DEBUG:
+            user_message = context.get_latest_user_transcript_message()
+            if user_message:
+                logger.info('User response: "{}"', user_message)
 
         # Stream Gemini response
         full_response = ""
+        pending: list[str] = []
+        pending_len = 0
         stream = await self.client.aio.models.generate_content_stream(
-            model=self.model_id,
+            **request_template,
             contents=messages,
-            config=enhanced_config,
         )
 
         async for msg in stream:
             if msg.text:
                 full_response += msg.text
-                yield AgentResponse(content=msg.text)
+                pending.append(msg.text)
+                pending_len += len(msg.text)
+
+            # Flush buffered text once it is long enough, and always before a
+            # tool call so it is spoken ahead of the next question
+            if pending and (pending_len >= _MIN_RESPONSE_CHUNK_CHARS or msg.function_calls):
+                yield AgentResponse(content="".join(pending))
+                pending = []
+                pending_len = 0
 
             if msg.function_calls:
                 for function_call in msg.function_calls:
-                    if function_call.name == RecordFormFieldTool.name():
+                    if function_call.name == RecordFormFieldTool.NAME:
+                        # Check against the live question, since an earlier call in
+                        # this stream may already have advanced it
+                        expected = self.get_current_question()
                         field_name = function_call.args.get(
-                            "field_name", current_question.field_name
+                            "field_name", expected.field_name if expected else ""
                         )
                         value = function_call.args.get("value", "")
 
-                        logger.info(f"Recording: {field_name} = {value}")
+                        # Re-recording an earlier field would overwrite its answer
+                        # and skip the question being asked, so ignore it
+                        if not expected or field_name != expected.field_name:
+                            logger.warning(
+                                "Ignoring {} = {}: not the current question", field_name, value
+                            )
+                            continue
+
+                        logger.info("Recording: {} = {}", field_name, value)
 
                         # Store data first
                         self.collected_data[field_name] = value
-                        # Fill the form field asynchronously in background
+                        # Queue the field for the background fill worker
                         # (non-blocking)
-                        asyncio.create_task(self._fill_form_field_async(field_name, value))
+                        self._fill_queue.put_nowait((field_name, value))
                         # Log the collected data
-                        logger.info(f"Collected: {field_name}={value}")
+                        logger.info("Collected: {}={}", field_name, value)
                         # Move to next question immediately
                         # (don't wait for form filling)
-                        self.current_question_index += 1
-
-                        # Clear context
-                        self.clear_context()
+                        self._advance()
 
                         # Get next question
                         next_question = self.get_current_question()
                         if next_question:
-                            yield AgentResponse(content=f"Great! {next_question.question}")
+                            yield self._next_responses[self.current_question_index]
 
                         # Yield tool result immediately
                         yield ToolResult(
-                            tool_name="record_form_field",
+                            tool_name=RecordFormFieldTool.NAME,
                             tool_args={"field_name": field_name, "value": value},
                             result=f"Recorded: {field_name}={value}",
                         )
 
+        # Flush whatever text is left at the end of the stream
+        if pending:
+            yield AgentResponse(content="".join(pending))
+
         if full_response:
-            logger.info(f'Agent response: "{full_response}"')
+            logger.info('Agent response: "{}"', full_response)
@@ -53,14 +53,15 @@ async def handle_new_call(system: VoiceAgentSystem, call_request: CallRequest) -
         .broadcast()
     )
 
-    # Start the system
-    await system.start()
-
-    # Wait for call to end
-    await system.wait_for_shutdown()
-
-    # Ensure form is submitted when call ends
-    await form_node.cleanup_and_submit()
+    try:
+        # Start the system
+        await system.start()
+
+        # Wait for call to end
+        await system.wait_for_shutdown()
+    finally:
+        # Ensure form is submitted and the browser closed however the call ends
+        await form_node.cleanup_and_submit()
 
 
 # Create the voice agent application
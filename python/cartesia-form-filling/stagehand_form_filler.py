@@ -6,14 +6,21 @@ mapping, field filling, and form submission.
 """
 
 import asyncio
+import json
 import os
+import re
+import tempfile
 from dataclasses import dataclass
 from enum import Enum
+from pathlib import Path
 
 from loguru import logger
 
 from stagehand import AsyncStagehand
 
+# Observed actions for each form, keyed by form URL, reused across calls
+ACTION_CACHE_FILE = Path(__file__).parent / "action_cache.json"
+
 
 class FieldType(Enum):
     TEXT = "text"
@@ -25,7 +32,7 @@ class FieldType(Enum):
     TEXTAREA = "textarea"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FormField:
     """Represents a form field with its metadata"""
 
@@ -33,82 +40,108 @@ class FormField:
     field_type: FieldType
     label: str
     required: bool = False
-    options: list[str] | None = None
+    options: tuple[str, ...] | None = None
+
+
+# Question ID -> form field, built once at import and shared by every filler
+_FIELD_MAPPINGS: dict[str, FormField] = {
+    "full_name": FormField(
+        field_id="full_name",
+        field_type=FieldType.TEXT,
+        label="What is your full name?",
+        required=True,
+    ),
+    "email": FormField(
+        field_id="email",
+        field_type=FieldType.EMAIL,
+        label="What is your email address?",
+        required=True,
+    ),
+    "phone": FormField(
+        field_id="phone",
+        field_type=FieldType.PHONE,
+        label="What is your phone number?",
+        required=False,
+    ),
+    "work_eligibility": FormField(
+        field_id="work_eligibility",
+        field_type=FieldType.RADIO,
+        label="Are you legally eligible to work in this country?",
+        options=("Yes", "No"),
+        required=True,
+    ),
+    "availability_type": FormField(
+        field_id="availability",
+        field_type=FieldType.RADIO,
+        label="What's your availability?",
+        options=("Temporary", "Part-time", "Full-time"),
+        required=True,
+    ),
+    "additional_info": FormField(
+        field_id="additional_info",
+        field_type=FieldType.TEXTAREA,
+        label="Anything else you'd like to let us know about you?",
+        required=False,
+    ),
+    "role_selection": FormField(
+        field_id="role_selection",
+        field_type=FieldType.CHECKBOX,
+        label="Which of these roles are you applying for?",
+        options=(
+            "Sales manager",
+            "IT Support",
+            "Recruiting",
+            "Software engineer",
+            "Marketing specialist",
+        ),
+        required=True,
+    ),
+    "previous_experience": FormField(
+        field_id="previous_experience",
+        field_type=FieldType.RADIO,
+        label=("Have you worked in a role similar to this one in the past?"),
+        options=("Yes", "No"),
+        required=True,
+    ),
+    "skills_experience": FormField(
+        field_id="skills_experience",
+        field_type=FieldType.TEXTAREA,
+        label=(
+            "What relevant skills and experience do you have "
+            "that make you a strong candidate for this position?"
+        ),
+        required=True,
+    ),
+}
+
+# Fields filled by typing, which can share one observe() to find them all
+TEXT_FIELD_TYPES = (FieldType.TEXT, FieldType.EMAIL, FieldType.PHONE, FieldType.TEXTAREA)
+
+# Observed descriptions are asked to start with "[question_id]"
+_FIELD_ID_TAG = re.compile(r"\s*\[(\w+)\]")
+_WORD = re.compile(r"[a-z]+")
+# Question words that say nothing about which field a label belongs to
+_LABEL_STOPWORDS = frozenset(
+    {"what", "whats", "is", "are", "your", "you", "the", "a", "an", "of", "to", "in", "s"}
+)
+
+
+def _label_words(label: str) -> set[str]:
+    """Return the words of a field label that identify the field.
+
+    Args:
+        label: The field's question text.
+
+    Returns:
+        Lowercased label words, minus question filler like "what is your".
+    """
+    return set(_WORD.findall(label.lower())) - _LABEL_STOPWORDS
 
 
 class FormFieldMapping:
     """Maps conversation questions to actual form fields"""
 
-    def __init__(self):
-        self.field_mappings = {
-            "full_name": FormField(
-                field_id="full_name",
-                field_type=FieldType.TEXT,
-                label="What is your full name?",
-                required=True,
-            ),
-            "email": FormField(
-                field_id="email",
-                field_type=FieldType.EMAIL,
-                label="What is your email address?",
-                required=True,
-            ),
-            "phone": FormField(
-                field_id="phone",
-                field_type=FieldType.PHONE,
-                label="What is your phone number?",
-                required=False,
-            ),
-            "work_eligibility": FormField(
-                field_id="work_eligibility",
-                field_type=FieldType.RADIO,
-                label="Are you legally eligible to work in this country?",
-                options=["Yes", "No"],
-                required=True,
-            ),
-            "availability_type": FormField(
-                field_id="availability",
-                field_type=FieldType.RADIO,
-                label="What's your availability?",
-                options=["Temporary", "Part-time", "Full-time"],
-                required=True,
-            ),
-            "additional_info": FormField(
-                field_id="additional_info",
-                field_type=FieldType.TEXTAREA,
-                label="Anything else you'd like to let us know about you?",
-                required=False,
-            ),
-            "role_selection": FormField(
-                field_id="role_selection",
-                field_type=FieldType.CHECKBOX,
-                label="Which of these roles are you applying for?",
-                options=[
-                    "Sales manager",
-                    "IT Support",
-                    "Recruiting",
-                    "Software engineer",
-                    "Marketing specialist",
-                ],
-                required=True,
-            ),
-            "previous_experience": FormField(
-                field_id="previous_experience",
-                field_type=FieldType.RADIO,
-                label=("Have you worked in a role similar to this one in the past?"),
-                options=["Yes", "No"],
-                required=True,
-            ),
-            "skills_experience": FormField(
-                field_id="skills_experience",
-                field_type=FieldType.TEXTAREA,
-                label=(
-                    "What relevant skills and experience do you have "
-                    "that make you a strong candidate for this position?"
-                ),
-                required=True,
-            ),
-        }
+    field_mappings = _FIELD_MAPPINGS
 
     def get_form_field(self, question_id: str) -> FormField | None:
         """Get the form field mapping for a question ID.
@@ -130,8 +163,173 @@ class StagehandFormFiller:
         self.client: AsyncStagehand | None = None
         self.session = None
         self.is_initialized = False
+        self._init_lock = asyncio.Lock()
         self.field_mapper = FormFieldMapping()
         self.collected_data: dict[str, str] = {}
+        # Actions Stagehand observed for this form, so repeat fills skip the LLM
+        self._action_cache: dict[str, dict] = self._load_action_cache()
+        self._action_cache_dirty = False
+        # Text fields are bound with one observe on the first text fill
+        self._text_fields_bound = False
+        self._bind_lock = asyncio.Lock()
+
+    def _load_action_cache(self) -> dict[str, dict]:
+        """Load the cached actions for this form from disk.
+
+        Returns:
+            Cached actions keyed by field, or an empty dict if none are saved.
+        """
+        try:
+            with open(ACTION_CACHE_FILE) as f:
+                return json.load(f).get(self.form_url, {})
+        except (OSError, ValueError) as e:
+            if ACTION_CACHE_FILE.exists():
+                logger.warning(f"Ignoring unreadable action cache: {e}")
+            return {}
+
+    def _save_action_cache(self) -> None:
+        """Write this form's cached actions to disk, keeping other forms' entries.
+
+        Returns:
+            None.
+        """
+        try:
+            with open(ACTION_CACHE_FILE) as f:
+                forms = json.load(f)
+        except (OSError, ValueError):
+            forms = {}
+
+        forms[self.form_url] = self._action_cache
+        # Write to a temp file and swap it in, so a crash or a second filler
+        # saving at the same time never leaves a half-written cache behind
+        with tempfile.NamedTemporaryFile(
+            "w", dir=ACTION_CACHE_FILE.parent, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(forms, f, indent=2)
+        os.replace(f.name, ACTION_CACHE_FILE)
+
+    async def _bind_text_fields(self) -> None:
+        """Observe every unbound text field on the form at once and cache an action for each.
+
+        One observe() call replaces a separate observe per field. The instruction
+        lists each field with its id and asks for that id at the start of the
+        matching result's description; results without an id fall back to a
+        label-word match that must pick out exactly one field. Fields that can't
+        be matched are observed individually when they are filled.
+
+        Returns:
+            None.
+        """
+        unbound = {
+            question_id: field
+            for question_id, field in self.field_mapper.field_mappings.items()
+            if field.field_type in TEXT_FIELD_TYPES and question_id not in self._action_cache
+        }
+        if not unbound:
+            return
+
+        questions = "\n".join(
+            f"[{question_id}] {field.label}" for question_id, field in unbound.items()
+        )
+        try:
+            observe_response = await self.session.observe(
+                instruction=(
+                    "Find the text input or text area for each of these questions. Start each "
+                    "result's description with the bracketed id of its question.\n" + questions
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Could not observe form fields: {e}")
+            return
+
+        bound = 0
+        for result in observe_response.data.results:
+            action = result.model_dump() if hasattr(result, "model_dump") else dict(result)
+            description = action.get("description") or ""
+
+            tagged = _FIELD_ID_TAG.match(description)
+            if tagged:
+                question_id = tagged.group(1)
+            else:
+                words = set(_WORD.findall(description.lower()))
+                candidates = [
+                    question_id
+                    for question_id, field in unbound.items()
+                    if _label_words(field.label) <= words
+                ]
+                # An ambiguous description could belong to either field, so skip it
+                question_id = candidates[0] if len(candidates) == 1 else None
+
+            if question_id not in unbound:
+                continue
+            # The answer is swapped in as the argument when the field is filled
+            self._action_cache[question_id] = {**action, "method": "fill", "arguments": []}
+            self._action_cache_dirty = True
+            del unbound[question_id]
+            bound += 1
+
+        logger.info(f"Bound {bound} text fields from one observe, {len(unbound)} left unbound")
+
+    async def _ensure_text_fields_bound(self) -> None:
+        """Bind the text fields on the first text fill, once per filler.
+
+        Returns:
+            None.
+        """
+        if self._text_fields_bound:
+            return
+
+        # Concurrent text fills wait for the single observe instead of each starting one
+        async with self._bind_lock:
+            if self._text_fields_bound:
+                return
+            await self._bind_text_fields()
+            self._text_fields_bound = True
+
+    async def _act_with_cache(self, key: str, instruction: str, answer: str | None) -> None:
+        """Run an instruction, reusing the action observed for it last time.
+
+        On a cache miss the instruction is observed (one LLM call) and the
+        resulting action is run and cached. On a hit the cached action runs
+        without any LLM call. If a cached action fails, it is dropped and the
+        instruction is run through Stagehand's LLM-backed act instead.
+
+        Args:
+            key: Cache key for the action.
+            instruction: Natural language instruction for Stagehand.
+            answer: Value to type into the element, replacing the cached action's
+                arguments, or None to run the cached action unchanged.
+        """
+        action = self._action_cache.get(key)
+        if action:
+            if answer is not None:
+                action = {**action, "arguments": [answer]}
+            try:
+                await self.session.act(input=action)
+                logger.info(f"Cache hit for: {key}")
+                return
+            except Exception as e:
+                logger.warning(f"Cached action for {key} failed, retrying with LLM: {e}")
+                del self._action_cache[key]
+                self._action_cache_dirty = True
+                await self.session.act(input=instruction)
+                return
+
+        observe_response = await self.session.observe(instruction=instruction)
+        results = observe_response.data.results
+        if not results:
+            await self.session.act(input=instruction)
+            return
+
+        action = results[0]
+        if hasattr(action, "model_dump"):
+            action = action.model_dump()
+        await self.session.act(input=action)
+        if answer is not None:
+            # Don't persist the caller's answer; it is swapped back in on a hit
+            action = {**action, "description": f"Fill the {key} field", "arguments": []}
+        self._action_cache[key] = action
+        self._action_cache_dirty = True
 
     async def initialize(self) -> None:
         """Initialize Stagehand and open the form.
@@ -142,34 +340,39 @@ class StagehandFormFiller:
         if self.is_initialized:
             return
 
-        try:
-            logger.info("Initializing Stagehand browser automation")
+        # Concurrent first callers wait here so only one session is created
+        async with self._init_lock:
+            if self.is_initialized:
+                return
 
-            self.client = AsyncStagehand(
-                browserbase_api_key=os.environ.get("BROWSERBASE_API_KEY"),
-                browserbase_project_id=os.environ.get("BROWSERBASE_PROJECT_ID"),
-                model_api_key=os.environ.get("GEMINI_API_KEY"),
-            )
+            try:
+                logger.info("Initializing Stagehand browser automation")
 
-            self.session = await self.client.sessions.create(
-                model_name="google/gemini-3-flash-preview"
-            )
+                self.client = AsyncStagehand(
+                    browserbase_api_key=os.environ.get("BROWSERBASE_API_KEY"),
+                    browserbase_project_id=os.environ.get("BROWSERBASE_PROJECT_ID"),
+                    model_api_key=os.environ.get("GEMINI_API_KEY"),
+                )
 
-            logger.info(f"Session started: {self.session.id}")
+                self.session = await self.client.sessions.create(
+                    model_name="google/gemini-3-flash-preview"
+                )
 
-            # Navigate to form
-            logger.info(f"Opening form: {self.form_url}")
-            await self.session.navigate(url=self.form_url)
+                logger.info(f"Session started: {self.session.id}")
 
-            # Wait for form to load
-            await asyncio.sleep(2)
+                # Navigate to form. The form is rendered client-side, so wait for the
+                # network to go idle rather than sleeping for a fixed time
+                logger.info(f"Opening form: {self.form_url}")
+                await self.session.navigate(
+                    url=self.form_url, options={"wait_until": "networkidle"}
+                )
 
-            self.is_initialized = True
-            logger.info("Browser automation initialized successfully")
+                self.is_initialized = True
+                logger.info("Browser automation initialized successfully")
 
-        except Exception as e:
-            logger.error(f"Failed to initialize Stagehand: {e}")
-            raise
+            except Exception as e:
+                logger.error(f"Failed to initialize Stagehand: {e}")
+                raise
 
     async def fill_field(self, question_id: str, answer: str) -> bool:
         """Fill a specific form field based on the question ID and answer.
@@ -199,26 +402,41 @@ class StagehandFormFiller:
 
             logger.info(f"Async filling field '{field.label}' with: {answer}")
 
-            # Use Stagehand's natural language API to fill the field
-            if field.field_type in [FieldType.TEXT, FieldType.EMAIL, FieldType.PHONE]:
-                await self.session.act(input=f"Fill in the '{field.label}' field with: {answer}")
+            # Use Stagehand's natural language API to fill the field. Text
+            # fields cache one action per field and swap in the new answer;
+            # choice fields click a different element per answer, so they
+            # cache one action per (field, answer)
+            if field.field_type in TEXT_FIELD_TYPES:
+                await self._ensure_text_fields_bound()
+
+            if field.field_type in (FieldType.TEXT, FieldType.EMAIL, FieldType.PHONE):
+                await self._act_with_cache(
+                    question_id, f"Fill in the '{field.label}' field with: {answer}", answer
+                )
 
             elif field.field_type == FieldType.TEXTAREA:
-                await self.session.act(input=f"Type in the '{field.label}' text area: {answer}")
+                await self._act_with_cache(
+                    question_id, f"Type in the '{field.label}' text area: {answer}", answer
+                )
 
             elif field.field_type in [FieldType.SELECT, FieldType.RADIO]:
-                await self.session.act(input=f"Select '{answer}' for the '{field.label}' field")
+                await self._act_with_cache(
+                    f"{question_id}={answer.lower()}",
+                    f"Select '{answer}' for the '{field.label}' field",
+                    None,
+                )
 
             elif field.field_type == FieldType.CHECKBOX:
                 # For role selection, check the specific role checkbox
                 if question_id == "role_selection":
-                    await self.session.act(input=f"Check the '{answer}' checkbox")
+                    instruction = f"Check the '{answer}' checkbox"
                 else:
                     # For other checkboxes, check/uncheck based on answer
                     if answer.lower() in ["yes", "true"]:
-                        await self.session.act(input=f"Check the '{field.label}' checkbox")
+                        instruction = f"Check the '{field.label}' checkbox"
                     else:
-                        await self.session.act(input=f"Uncheck the '{field.label}' checkbox")
+                        instruction = f"Uncheck the '{field.label}' checkbox"
+                await self._act_with_cache(f"{question_id}={answer.lower()}", instruction, None)
 
             return True
 
@@ -226,6 +444,38 @@ class StagehandFormFiller:
             logger.error(f"Error filling field {question_id}: {e}")
             return False
 
+    async def fill_fields(
+        self, fields: list[tuple[str, str]], concurrent: bool = False
+    ) -> list[bool]:
+        """Fill several form fields in one pass over the page.
+
+        By default fields are filled one after another, since they all act on
+        the same page and concurrent actions can interleave focus and typing.
+        With concurrent=True the act() round-trips are overlapped instead,
+        which is faster for forms whose fields don't interfere.
+
+        Args:
+            fields: (question_id, answer) pairs in the order they were recorded.
+            concurrent: Fill all fields at once with asyncio.gather.
+
+        Returns:
+            Whether each field was filled successfully, in the same order.
+        """
+        if not self.is_initialized:
+            await self.initialize()
+
+        if not concurrent:
+            results = []
+            for question_id, answer in fields:
+                results.append(await self.fill_field(question_id, answer))
+            return results
+
+        results = await asyncio.gather(
+            *(self.fill_field(question_id, answer) for question_id, answer in fields),
+            return_exceptions=True,
+        )
+        return [result is True for result in results]
+
     async def submit_form(self) -> bool:
         """Submit the completed form.
 
@@ -236,11 +486,9 @@ class StagehandFormFiller:
             logger.info("Submitting the form")
             logger.info(f"Form has {len(self.collected_data)} fields filled")
 
+            # act() returns once the click has been performed and the page has settled
             await self.session.act(input="Find and click the Submit button to submit the form")
 
-            # Wait for submission to process
-            await asyncio.sleep(1)
-
             logger.info("Form submitted successfully!")
             return True
 
@@ -254,6 +502,13 @@ class StagehandFormFiller:
         Returns:
             None.
         """
+        if self._action_cache_dirty:
+            try:
+                await asyncio.to_thread(self._save_action_cache)
+                self._action_cache_dirty = False
+            except OSError as e:
+                logger.error(f"Error saving action cache: {e}")
+
         if self.session:
             try:
                 await self.session.end()
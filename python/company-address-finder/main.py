@@ -3,12 +3,26 @@
 import asyncio
 import json
 import os
+import re
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
+from urllib.parse import urlparse
 
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, HttpUrl
 
 from stagehand import Stagehand, StagehandConfig
 
+try:
+    # uvloop schedules callbacks faster than the default asyncio loop, which helps when
+    # many concurrent sessions are waiting on the network. It isn't available on Windows.
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Load environment variables
 load_dotenv()
 
@@ -20,6 +34,16 @@ COMPANY_NAMES = ["Browserbase", "Mintlify", "Wordware", "Reducto"]
 # Set to > 1 for concurrent processing (requires Startup or Developer plan or higher)
 MAX_CONCURRENT = 1
 
+# Results are cached on disk per company name so repeat runs skip the browser and LLM work.
+# Run with --no-cache to ignore (and refresh) the cache.
+CACHE_FILE = Path(__file__).parent / "address_cache.json"
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def log(message: str) -> None:
+    """Print a progress or diagnostic message to stderr, keeping stdout pure JSONL"""
+    print(message, file=sys.stderr)
+
 
 class CompanyData(BaseModel):
     company_name: str
@@ -43,6 +67,122 @@ class CompanyAddress(BaseModel):
     company_address: str = Field(..., description="The physical company mailing address")
 
 
+# Browserbase session settings shared by every pooled session
+STAGEHAND_CONFIG = StagehandConfig(
+    env="BROWSERBASE",
+    api_key=os.environ.get("BROWSERBASE_API_KEY"),
+    project_id=os.environ.get("BROWSERBASE_PROJECT_ID"),
+    verbose=0,
+    # 0 = errors only, 1 = info, 2 = debug
+    # (When handling sensitive data like passwords or API keys, set verbose: 0 to prevent secrets from appearing in logs.)
+    # https://docs.stagehand.dev/configuration/logging
+    browserbase_session_create_params={
+        "project_id": os.environ.get("BROWSERBASE_PROJECT_ID"),
+        "region": "us-east-1",
+        "timeout": 900,
+        "browser_settings": {
+            "viewport": {
+                "width": 1920,
+                "height": 1080,
+            }
+        },
+    },
+)
+
+
+# Hands out initialized Stagehand sessions, reusing released ones
+# Starting a Browserbase session is a multi-second cold start, so companies borrow a warm
+# session instead of each opening (and closing) their own. At most `size` are created.
+class StagehandPool:
+    def __init__(self, config: StagehandConfig, size: int = 1):
+        self._config = config
+        self._free: asyncio.Queue[Stagehand] = asyncio.Queue()
+        self._created: list[Stagehand] = []
+        # Bounds how many sessions can be checked out (and therefore created) at once
+        self._slots = asyncio.Semaphore(size)
+
+    # Borrow a session for the duration of the `async with` block
+    @asynccontextmanager
+    async def acquire(self, label: str):
+        async with self._slots:
+            try:
+                stagehand = self._free.get_nowait()
+                log(f"[{label}] Reusing browser session...")
+            except asyncio.QueueEmpty:
+                # No idle session - start a new one
+                log(f"[{label}] Initializing browser session...")
+                stagehand = Stagehand(self._config)
+                self._created.append(stagehand)
+                await stagehand.init()
+
+                session_id = getattr(stagehand, "session_id", None) or getattr(
+                    stagehand, "browserbase_session_id", None
+                )
+                if session_id:
+                    log(f"[{label}] Live View Link: https://browserbase.com/sessions/{session_id}")
+            try:
+                yield stagehand
+            finally:
+                await self._release(stagehand, label)
+
+    # Reset a session so the next company starts clean, or retire it if that fails
+    async def _release(self, stagehand: Stagehand, label: str):
+        try:
+            await stagehand.context.clear_cookies()
+            await stagehand.page.goto("about:blank")
+            self._free.put_nowait(stagehand)
+        except Exception as reset_error:
+            log(f"[{label}] Could not reset browser session, closing it: {reset_error}")
+            self._created.remove(stagehand)
+            with suppress(Exception):
+                await stagehand.close()
+
+    # Close every session the pool has started
+    async def close(self):
+        results = await asyncio.gather(
+            *(stagehand.close() for stagehand in self._created), return_exceptions=True
+        )
+        for error in results:
+            if isinstance(error, Exception):
+                log(f"Error closing browser: {error}")
+        log(f"Closed {len(self._created)} browser session(s)")
+        self._created.clear()
+
+
+# Loads cached results that are younger than CACHE_TTL_SECONDS, keyed by company name
+# Entries without a result or a numeric timestamp are skipped rather than crashing the run
+def load_cache() -> dict[str, dict]:
+    try:
+        entries = json.loads(CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(entries, dict):
+        return {}
+
+    now = time.time()
+    return {
+        name: entry
+        for name, entry in entries.items()
+        if isinstance(entry, dict)
+        and "result" in entry
+        and isinstance(entry.get("cached_at"), int | float)
+        and now - entry["cached_at"] < CACHE_TTL_SECONDS
+    }
+
+
+# Writes the cache back to disk
+# Goes through a temp file and os.replace so a crash mid-write never leaves a truncated cache
+def save_cache(cache: dict[str, dict]) -> None:
+    try:
+        with tempfile.NamedTemporaryFile(
+            "w", dir=CACHE_FILE.parent, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(cache, f, indent=2)
+        os.replace(f.name, CACHE_FILE)
+    except OSError as error:
+        log(f"Could not save cache: {error}")
+
+
 # Retries an async function with exponential backoff
 # Handles transient network/page load failures for reliability
 async def with_retry(fn, description: str, max_retries: int = 3, delay_ms: int = 2000):
@@ -54,177 +194,264 @@ async def with_retry(fn, description: str, max_retries: int = 3, delay_ms: int =
         except Exception as error:
             last_error = error
             if attempt < max_retries:
-                print(f"{description} - Attempt {attempt} failed, retrying in {delay_ms}ms...")
+                log(f"{description} - Attempt {attempt} failed, retrying in {delay_ms}ms...")
                 await asyncio.sleep(delay_ms / 1000.0)
 
     raise Exception(f"{description} - Failed after {max_retries} attempts: {last_error}")
 
 
-# Processes a single company: finds homepage, extracts ToS/Privacy links, and extracts physical address
-# Uses CUA agent to navigate and Stagehand extract() for structured data extraction
-# Falls back to Privacy Policy if address not found in Terms of Service
-async def process_company(company_name: str) -> CompanyData:
-    print(f"\nProcessing: {company_name}")
-
-    stagehand = None
-
-    try:
-        # Initialize Stagehand with Browserbase
-        stagehand = Stagehand(
-            StagehandConfig(
-                env="BROWSERBASE",
-                api_key=os.environ.get("BROWSERBASE_API_KEY"),
-                project_id=os.environ.get("BROWSERBASE_PROJECT_ID"),
-                verbose=0,
-                # 0 = errors only, 1 = info, 2 = debug
-                # (When handling sensitive data like passwords or API keys, set verbose: 0 to prevent secrets from appearing in logs.)
-                # https://docs.stagehand.dev/configuration/logging
-                browserbase_session_create_params={
-                    "project_id": os.environ.get("BROWSERBASE_PROJECT_ID"),
-                    "region": "us-east-1",
-                    "timeout": 900,
-                    "browser_settings": {
-                        "viewport": {
-                            "width": 1920,
-                            "height": 1080,
-                        }
-                    },
-                },
-            )
-        )
+# Words that show a guessed domain is parked, for sale, or an error page rather than the company site
+PARKED_PAGE_MARKERS = (
+    "for sale",
+    "buy this domain",
+    "parked",
+    "not found",
+    "404",
+    "coming soon",
+    "under construction",
+)
 
-        print(f"[{company_name}] Initializing browser session...")
-        await stagehand.init()
 
-        session_id = getattr(stagehand, "session_id", None) or getattr(
-            stagehand, "browserbase_session_id", None
-        )
-        if session_id:
-            print(f"[{company_name}] Live View Link: https://browserbase.com/sessions/{session_id}")
+# Tries https://<company name>.com as the homepage before falling back to the CUA agent
+# Returns the final URL if the page loaded, stayed on that domain, and doesn't look parked
+async def guess_homepage(page, company_name: str) -> str | None:
+    slug = "".join(ch for ch in company_name.lower() if ch.isalnum())
+    if not slug:
+        return None
 
-        page = stagehand.page
+    candidate = f"https://{slug}.com"
+    log(f"[{company_name}] Trying {candidate}...")
+    try:
+        response = await page.goto(candidate, wait_until="domcontentloaded", timeout=5000)
+        if response is not None and not 200 <= response.status < 300:
+            return None
+
+        title = (await page.title()).lower()
+    except Exception:
+        return None
+
+    # Redirects to a registrar or marketplace land on a different domain
+    host = urlparse(page.url).hostname or ""
+    if slug not in host or any(marker in title for marker in PARKED_PAGE_MARKERS):
+        return None
+
+    return page.url
+
+
+# US-style mailing address: "548 Market St, Suite 100, San Francisco, CA 94104, USA"
+# A street suffix is required after the house number so section references like
+# "12 of this policy, Notices, Delaware, DE 19801" don't match, and a trailing
+# country is kept when the page gives one
+STREET_SUFFIX = (
+    r"(?:St|Street|Ave|Avenue|Blvd|Boulevard|Rd|Road|Dr|Drive|Ln|Lane|Way|Ct|Court|Pl|Place"
+    r"|Pkwy|Parkway|Hwy|Highway|Sq|Square|Ter|Terrace|Cir|Circle|Plz|Plaza|Broadway)\.?"
+)
+UNIT = r"(?:Suite|Ste\.?|Unit|Floor|Fl\.?|Room|#)\s*[\w-]+|\d+(?:st|nd|rd|th)\s+Floor"
+US_ADDRESS_PATTERN = re.compile(
+    rf"\b\d{{1,6}}\s+(?:[A-Za-z0-9.'-]+\s+){{0,5}}?{STREET_SUFFIX}\b"
+    rf"(?:,?\s*(?:{UNIT}))?"
+    r",\s*[A-Za-z .'-]{2,30},\s*[A-Z]{2}\s+\d{5}(?:-\d{4})?\b"
+    r"(?:,?\s*(?:United States(?: of America)?|U\.S\.A\.|USA|US)\b)?"
+)
+
+
+# Finds the distinct US-style addresses in the page text without calling the LLM
+# Line breaks become commas so addresses split across lines still match
+async def find_addresses_in_text(page) -> list[str]:
+    try:
+        text = await page.inner_text("body")
+    except Exception:
+        return []
 
-        # Navigate to Google as starting point for CUA agent to search and find company homepage
-        print(f"[{company_name}] Navigating to Google...")
-        await with_retry(
-            lambda: page.goto("https://www.google.com/", wait_until="domcontentloaded"),
-            f"[{company_name}] Initial navigation to Google",
-        )
+    # dict.fromkeys drops repeats while keeping the order they appear in
+    matches = US_ADDRESS_PATTERN.finditer(re.sub(r"\s*\n\s*", ", ", text))
+    return list(dict.fromkeys(match.group(0) for match in matches))
 
-        # Create CUA agent for autonomous navigation
-        # Agent can interact with the browser like a human: search, click, scroll, and navigate
-        print(f"[{company_name}] Creating Computer Use Agent...")
-        agent = stagehand.agent(
-            provider="google",
-            model="gemini-2.5-computer-use-preview-10-2025",
-            instructions=f"""You are a helpful assistant that can use a web browser.
-            You are currently on the following page: {page.url}.
-            Do not ask follow up questions, the user will trust your judgement.""",
-            options={
-                "api_key": os.getenv("GEMINI_API_KEY"),
-            },
-        )
 
-        print(f"[{company_name}] Finding company homepage using CUA agent...")
+# Navigates a page to a legal document and extracts the company mailing address from it
+# A single address found by pattern match is returned without calling the LLM. Legal pages
+# often also list other addresses (e.g. an arbitration venue), so when several match the
+# LLM is asked to pick the company's own from them
+# Returns an empty string if the page has no address or extraction fails
+async def extract_address(page, company_name: str, link: str, page_name: str) -> str:
+    try:
         await with_retry(
-            lambda: agent.execute(
-                instruction=f"Navigate to the {company_name} website",
-                max_steps=5,
-                auto_screenshot=True,
-            ),
-            f"[{company_name}] Navigation to website",
+            lambda: page.goto(link),
+            f"[{company_name}] Navigate to {page_name}",
         )
 
-        homepage_url = page.url
-        print(f"[{company_name}] Homepage found: {homepage_url}")
+        candidates = await find_addresses_in_text(page)
+        if len(candidates) == 1:
+            log(f"[{company_name}] Address found in {page_name} (pattern match): {candidates[0]}")
+            return candidates[0]
+
+        instruction = f"Extract the physical company mailing address (street, city, state, postal code, and country if present) from the {page_name} page. Ignore phone numbers or email addresses."
+        if candidates:
+            instruction += (
+                f" The page lists these addresses: {'; '.join(candidates)}. Return the one"
+                f" that belongs to {company_name} itself, not an arbitration venue, court,"
+                " or other third party."
+            )
 
-        # Extract both legal document links in parallel for speed (independent operations)
-        print(f"[{company_name}] Finding Terms of Service & Privacy Policy links...")
+        address_result = await page.extract(instruction, schema=CompanyAddress)
 
-        results = await asyncio.gather(
-            page.extract(
-                "extract the link to the Terms of Service page (may also be labeled as Terms of Use, Terms and Conditions, or similar equivalent names)",
-                schema=TermsOfServiceLink,
-            ),
-            page.extract(
-                "extract the link to the Privacy Policy page (may also be labeled as Privacy Notice, Privacy Statement, or similar equivalent names)",
-                schema=PrivacyPolicyLink,
-            ),
-            return_exceptions=True,
-        )
+        if address_result.company_address and address_result.company_address.strip():
+            address = address_result.company_address.strip()
+            log(f"[{company_name}] Address found in {page_name}: {address}")
+            return address
+    except Exception:
+        log(f"[{company_name}] Could not extract address from {page_name} page")
 
-        terms_of_service_link = ""
-        privacy_policy_link = ""
+    return ""
 
-        if not isinstance(results[0], Exception) and results[0]:
-            terms_of_service_link = str(results[0].terms_of_service_link)
-            print(f"[{company_name}] Terms of Service: {terms_of_service_link}")
 
-        if not isinstance(results[1], Exception) and results[1]:
-            privacy_policy_link = str(results[1].privacy_policy_link)
-            print(f"[{company_name}] Privacy Policy: {privacy_policy_link}")
+# Processes a single company: finds homepage, extracts ToS/Privacy links, and extracts physical address
+# Uses CUA agent to navigate and Stagehand extract() for structured data extraction
+# Checks the Terms of Service and Privacy Policy pages concurrently for the address
+async def process_company(company_name: str, pool: StagehandPool) -> CompanyData:
+    log(f"\nProcessing: {company_name}")
 
-        address = ""
+    try:
+        async with pool.acquire(company_name) as stagehand:
+            page = stagehand.page
+
+            # Try the obvious https://<name>.com first - the CUA agent below costs several model calls
+            homepage_url = await guess_homepage(page, company_name)
+
+            if not homepage_url:
+                # Navigate to Google as starting point for CUA agent to search and find company homepage
+                log(f"[{company_name}] Navigating to Google...")
+                await with_retry(
+                    lambda: page.goto("https://www.google.com/", wait_until="domcontentloaded"),
+                    f"[{company_name}] Initial navigation to Google",
+                )
 
-        # Try Terms of Service first - most likely to contain physical address for legal/contact purposes
-        if terms_of_service_link:
-            print(f"[{company_name}] Extracting address from Terms of Service...")
-            await with_retry(
-                lambda: page.goto(terms_of_service_link),
-                f"[{company_name}] Navigate to Terms of Service",
-            )
+                # Create CUA agent for autonomous navigation
+                # Agent can interact with the browser like a human: search, click, scroll, and navigate
+                log(f"[{company_name}] Creating Computer Use Agent...")
+                agent = stagehand.agent(
+                    provider="google",
+                    model="gemini-2.5-computer-use-preview-10-2025",
+                    instructions=f"""You are a helpful assistant that can use a web browser.
+                    You are currently on the following page: {page.url}.
+                    Do not ask follow up questions, the user will trust your judgement.""",
+                    options={
+                        "api_key": os.getenv("GEMINI_API_KEY"),
+                    },
+                )
 
-            try:
-                address_result = await page.extract(
-                    "Extract the physical company mailing address (street, city, state, postal code, and country if present) from the Terms of Service page. Ignore phone numbers or email addresses.",
-                    schema=CompanyAddress,
+                log(f"[{company_name}] Finding company homepage using CUA agent...")
+                await with_retry(
+                    lambda: agent.execute(
+                        instruction=f"Navigate to the {company_name} website",
+                        max_steps=5,
+                        auto_screenshot=True,
+                    ),
+                    f"[{company_name}] Navigation to website",
                 )
+                homepage_url = page.url
 
-                if address_result.company_address and address_result.company_address.strip():
-                    address = address_result.company_address.strip()
-                    print(f"[{company_name}] Address found in Terms of Service: {address}")
-            except Exception:
-                print(f"[{company_name}] Could not extract address from Terms of Service page")
+            log(f"[{company_name}] Homepage found: {homepage_url}")
 
-        # Fallback: check Privacy Policy if address not found in Terms of Service
-        if not address and privacy_policy_link:
-            print(
-                f"[{company_name}] Address not found in Terms of Service, trying Privacy Policy..."
-            )
-            await with_retry(
-                lambda: page.goto(privacy_policy_link),
-                f"[{company_name}] Navigate to Privacy Policy",
-            )
+            # Extract both legal document links in parallel for speed (independent operations)
+            # Each extraction gets its own page - two extracts against one page run one after the other
+            log(f"[{company_name}] Finding Terms of Service & Privacy Policy links...")
 
+            homepage_copy = await stagehand.context.new_page()
             try:
-                address_result = await page.extract(
-                    "Extract the physical company mailing address (street, city, state, postal code, and country if present) from the Privacy Policy page. Ignore phone numbers or email addresses.",
-                    schema=CompanyAddress,
+                await with_retry(
+                    lambda: homepage_copy.goto(homepage_url, wait_until="domcontentloaded"),
+                    f"[{company_name}] Open homepage in second page",
                 )
+                results = await asyncio.gather(
+                    page.extract(
+                        "extract the link to the Terms of Service page (may also be labeled as Terms of Use, Terms and Conditions, or similar equivalent names)",
+                        schema=TermsOfServiceLink,
+                    ),
+                    homepage_copy.extract(
+                        "extract the link to the Privacy Policy page (may also be labeled as Privacy Notice, Privacy Statement, or similar equivalent names)",
+                        schema=PrivacyPolicyLink,
+                    ),
+                    return_exceptions=True,
+                )
+            finally:
+                with suppress(Exception):
+                    await homepage_copy.close()
+
+            terms_of_service_link = ""
+            privacy_policy_link = ""
+
+            if not isinstance(results[0], Exception) and results[0]:
+                terms_of_service_link = str(results[0].terms_of_service_link)
+                log(f"[{company_name}] Terms of Service: {terms_of_service_link}")
+
+            if not isinstance(results[1], Exception) and results[1]:
+                privacy_policy_link = str(results[1].privacy_policy_link)
+                log(f"[{company_name}] Privacy Policy: {privacy_policy_link}")
+
+            address = ""
+            legal_pages = [
+                (link, page_name)
+                for link, page_name in (
+                    (terms_of_service_link, "Terms of Service"),
+                    (privacy_policy_link, "Privacy Policy"),
+                )
+                if link
+            ]
+
+            # Extract from both legal pages at once, on separate pages, and take the first address found.
+            # The Privacy Policy used to be tried only after the Terms of Service came back empty.
+            if legal_pages:
+                page_names = " & ".join(name for _, name in legal_pages)
+                log(f"[{company_name}] Extracting address from {page_names}...")
+                extra_pages = []
+
+                # A page that can't be opened counts as no address, so the links
+                # already found (and the other legal page) are kept
+                async def extract_from(link: str, page_name: str, use_main_page: bool) -> str:
+                    target_page = page
+                    if not use_main_page:
+                        try:
+                            target_page = await stagehand.context.new_page()
+                        except Exception as error:
+                            log(f"[{company_name}] Could not open a page for {page_name}: {error}")
+                            return ""
+                        extra_pages.append(target_page)
+                    return await extract_address(target_page, company_name, link, page_name)
+
+                tasks = {
+                    asyncio.create_task(extract_from(link, page_name, use_main_page=i == 0))
+                    for i, (link, page_name) in enumerate(legal_pages)
+                }
+                try:
+                    while tasks and not address:
+                        done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                        address = next((task.result() for task in done if task.result()), "")
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    for extra_page in extra_pages:
+                        with suppress(Exception):
+                            await extra_page.close()
+
+            if not address:
+                address = "Address not found in Terms of Service or Privacy Policy pages"
+                log(f"[{company_name}] {address}")
+
+            result = CompanyData(
+                company_name=company_name,
+                homepage_url=homepage_url,
+                terms_of_service_link=terms_of_service_link,
+                privacy_policy_link=privacy_policy_link,
+                address=address,
+            )
 
-                if address_result.company_address and address_result.company_address.strip():
-                    address = address_result.company_address.strip()
-                    print(f"[{company_name}] Address found in Privacy Policy: {address}")
-            except Exception:
-                print(f"[{company_name}] Could not extract address from Privacy Policy page")
-
-        if not address:
-            address = "Address not found in Terms of Service or Privacy Policy pages"
-            print(f"[{company_name}] {address}")
-
-        result = CompanyData(
-            company_name=company_name,
-            homepage_url=homepage_url,
-            terms_of_service_link=terms_of_service_link,
-            privacy_policy_link=privacy_policy_link,
-            address=address,
-        )
-
-        print(f"[{company_name}] Successfully processed")
-        return result
+            log(f"[{company_name}] Successfully processed")
+            return result
 
     except Exception as error:
-        print(f"[{company_name}] Error: {error}")
+        log(f"[{company_name}] Error: {error}")
 
         return CompanyData(
             company_name=company_name,
@@ -234,69 +461,81 @@ async def process_company(company_name: str) -> CompanyData:
             address=f"Error: {error}",
         )
 
-    finally:
-        if stagehand:
-            try:
-                await stagehand.close()
-                print(f"[{company_name}] Session closed successfully")
-            except Exception as close_error:
-                print(f"[{company_name}] Error closing browser: {close_error}")
-
 
-# Main orchestration function: processes companies sequentially or in batches based on MAX_CONCURRENT
+# Main orchestration function: processes companies concurrently, at most MAX_CONCURRENT at a time
 # Collects results and outputs final JSON summary
 async def main():
-    print("Starting Company Address Finder...")
+    log("Starting Company Address Finder...")
 
     company_names = COMPANY_NAMES
     max_concurrent = max(1, MAX_CONCURRENT)
     company_count = len(company_names)
     is_sequential = max_concurrent == 1
 
-    print(
-        f"\nProcessing {company_count} {'company' if company_count == 1 else 'companies'} {'sequentially' if is_sequential else f'concurrently (batch size: {max_concurrent})'}..."
+    log(
+        f"\nProcessing {company_count} {'company' if company_count == 1 else 'companies'} {'sequentially' if is_sequential else f'concurrently (up to {max_concurrent} at a time)'}..."
     )
 
-    all_results = []
+    # The semaphore caps open sessions at the plan's concurrency limit. Unlike fixed
+    # batches, a new company starts as soon as any running one finishes, so one slow
+    # company no longer holds up the rest of its batch.
+    semaphore = asyncio.Semaphore(max_concurrent)
 
-    if is_sequential:
-        for i, company_name in enumerate(company_names):
-            print(f"[{i + 1}/{len(company_names)}] {company_name}")
-            result = await process_company(company_name)
-            all_results.append(result)
-    else:
-        for i in range(0, len(company_names), max_concurrent):
-            batch = company_names[i : i + max_concurrent]
-            batch_number = i // max_concurrent + 1
-            total_batches = (len(company_names) + max_concurrent - 1) // max_concurrent
+    use_cache = "--no-cache" not in sys.argv[1:]
+    cache = load_cache()
 
-            print(f"\nBatch {batch_number}/{total_batches}: {', '.join(batch)}")
+    async def process_with_limit(i: int, company_name: str) -> CompanyData:
+        cached = cache.get(company_name) if use_cache else None
+        if cached:
+            log(f"[{i + 1}/{company_count}] {company_name} (cached)")
+            return CompanyData.model_validate(cached["result"])
 
-            batch_promises = [process_company(name) for name in batch]
-            batch_results = await asyncio.gather(*batch_promises)
-            all_results.extend(batch_results)
+        async with semaphore:
+            log(f"[{i + 1}/{company_count}] {company_name}")
+            result = await process_company(company_name, pool)
 
-            print(
-                f"Batch {batch_number}/{total_batches} completed: {len(batch_results)} companies processed"
-            )
+        # Only cache successful lookups so failures are retried next run
+        if result.homepage_url:
+            cache[company_name] = {"cached_at": time.time(), "result": result.model_dump()}
+        return result
 
-    print("\n" + "=" * 80)
-    print("RESULTS (JSON):")
-    print("=" * 80)
-    print(json.dumps([result.model_dump() for result in all_results], indent=2))
-    print("=" * 80)
+    # Sessions are reused across companies and only closed once everything is done
+    pool = StagehandPool(STAGEHAND_CONFIG, size=max_concurrent)
+    tasks = [
+        asyncio.create_task(process_with_limit(i, name)) for i, name in enumerate(company_names)
+    ]
+    processed_count = 0
+    try:
+        # Stream each result as one JSON line (JSONL) as soon as its company finishes,
+        # instead of holding every result until the slowest company is done.
+        # process_company catches its own errors, so every task yields a result.
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            processed_count += 1
+            sys.stdout.write(json.dumps(result.model_dump()) + "\n")
+            sys.stdout.flush()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await pool.close()
+        save_cache(cache)
 
-    print(f"\nComplete: processed {len(all_results)}/{len(company_names)} companies")
+    log(f"\nComplete: processed {processed_count}/{len(company_names)} companies")
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        # asyncio.run() only takes a loop_factory from Python 3.12; older versions
+        # run on the default loop
+        if uvloop is not None and sys.version_info >= (3, 12):
+            asyncio.run(main(), loop_factory=uvloop.new_event_loop)
+        else:
+            asyncio.run(main())
     except Exception as err:
-        print(f"Application error: {err}")
-        print("Common issues:")
-        print("  - Check .env file has BROWSERBASE_PROJECT_ID and BROWSERBASE_API_KEY")
-        print("  - Verify GEMINI_API_KEY is set")
-        print("  - Ensure COMPANY_NAMES is configured in the config section")
-        print("Docs: https://docs.stagehand.dev/v3/first-steps/introduction")
+        log(f"Application error: {err}")
+        log("Common issues:")
+        log("  - Check .env file has BROWSERBASE_PROJECT_ID and BROWSERBASE_API_KEY")
+        log("  - Verify GEMINI_API_KEY is set")
+        log("  - Ensure COMPANY_NAMES is configured in the config section")
+        log("Docs: https://docs.stagehand.dev/v3/first-steps/introduction")
         exit(1)
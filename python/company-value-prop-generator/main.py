@@ -1,6 +1,11 @@
 # Stagehand + Browserbase: Value Prop One-Liner Generator - See README.md for full documentation
 
+import functools
+import json
 import os
+import tempfile
+import time
+from pathlib import Path
 
 from dotenv import load_dotenv
 from openai import OpenAI
@@ -15,6 +20,10 @@ load_dotenv()
 # Domain to analyze - change this to target a different website
 target_domain = "www.browserbase.com"  # Or extract from email: email.split("@")[1]
 
+# Extracted value props and generated one-liners are cached here for a week
+CACHE_FILE = Path(__file__).parent / "value_prop_cache.json"
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
 # Initialize OpenAI client
 openai_client = OpenAI()
 
@@ -23,11 +32,62 @@ class ValueProp(BaseModel):
     value_prop: str = Field(..., description="the value proposition from the landing page")
 
 
-def generate_one_liner(domain: str) -> str:
+# Reads the whole cache file, or an empty cache if it is missing or unreadable
+def read_cache_file() -> dict:
+    try:
+        cache = json.loads(CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+# Loads cached entries younger than CACHE_TTL_SECONDS from one section of the cache file
+# Entries without a value or a numeric timestamp are skipped rather than crashing the run
+def load_cache(section: str) -> dict[str, dict]:
+    entries = read_cache_file().get(section)
+    if not isinstance(entries, dict):
+        return {}
+
+    now = time.time()
+    return {
+        key: entry
+        for key, entry in entries.items()
+        if isinstance(entry, dict)
+        and "value" in entry
+        and isinstance(entry.get("cached_at"), int | float)
+        and now - entry["cached_at"] < CACHE_TTL_SECONDS
+    }
+
+
+# Stores one entry in a section of the cache file, keeping everything else already there
+# Goes through a temp file and os.replace so a crash mid-write never leaves a truncated cache
+def save_to_cache(section: str, key: str, value: str) -> None:
+    cache = read_cache_file()
+    if not isinstance(cache.get(section), dict):
+        cache[section] = {}
+
+    cache[section][key] = {"cached_at": time.time(), "value": value}
+    try:
+        with tempfile.NamedTemporaryFile(
+            "w", dir=CACHE_FILE.parent, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(cache, f, indent=2)
+        os.replace(f.name, CACHE_FILE)
+    except OSError as error:
+        print(f"⚠️ Could not save cache: {error}")
+
+
+@functools.lru_cache(maxsize=128)
+def extract_value_prop(domain: str) -> str:
     """
-    Analyzes a website's landing page to generate a concise one-liner value proposition.
-    Extracts the value prop using Stagehand, then uses an LLM to format it into a short phrase starting with "your".
+    Extracts the value proposition from a domain's landing page using Stagehand.
+    Results are cached in memory and on disk, so a cached domain never opens a browser session.
     """
+    cached = load_cache("value_props").get(domain)
+    if cached:
+        print(f"📦 Using cached value prop for {domain}: {cached['value']}")
+        return cached["value"]
+
     # Initialize Stagehand with Browserbase for cloud-based browser automation
     client = Stagehand(
         browserbase_api_key=os.environ.get("BROWSERBASE_API_KEY"),
@@ -73,26 +133,46 @@ def generate_one_liner(domain: str) -> str:
             value_prop = extract_response.data.result.get("value_prop", "")
             print(f"📊 Extracted value prop for {domain}: {value_prop}")
 
-            # Validate extraction returned meaningful content
-            if not value_prop or value_prop.lower() == "null" or value_prop.lower() == "undefined":
-                print("⚠️ Value prop extraction returned empty or invalid result")
-                raise ValueError(f"No value prop found for {domain}")
-
-            # Generate one-liner using OpenAI
-            # Prompt uses few-shot examples to guide LLM toward concise, "your X" format
-            # System prompt enforces constraints (9 words max, no quotes, must start with "your")
-            print(f"🤖 Generating email one-liner for {domain}...")
-
-            response = openai_client.chat.completions.create(
-                model="gpt-4.1",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert at generating concise, unique descriptions of companies. Generate ONLY a concise description (no greetings or extra text). Don't use generic adjectives like 'comprehensive', 'innovative', or 'powerful'. Keep it short and concise, no more than 9 words. DO NOT USE QUOTES. Only use English. You MUST start the response with 'your'.",
-                    },
-                    {
-                        "role": "user",
-                        "content": f"""The response will be inserted into this template: "{{response}}"
+            browser.close()
+    finally:
+        client.sessions.end(id=session_id)
+        print("Session closed successfully")
+
+    # Validate extraction returned meaningful content
+    if not value_prop or value_prop.lower() == "null" or value_prop.lower() == "undefined":
+        print("⚠️ Value prop extraction returned empty or invalid result")
+        raise ValueError(f"No value prop found for {domain}")
+
+    save_to_cache("value_props", domain, value_prop)
+    return value_prop
+
+
+@functools.lru_cache(maxsize=128)
+def format_one_liner(value_prop: str) -> str:
+    """
+    Uses an LLM to turn a value proposition into a short phrase starting with "your".
+    Results are cached in memory and on disk, so a cached value prop skips the OpenAI call.
+    """
+    cached = load_cache("one_liners").get(value_prop)
+    if cached:
+        print(f"📦 Using cached one-liner: {cached['value']}")
+        return cached["value"]
+
+    # Generate one-liner using OpenAI
+    # Prompt uses few-shot examples to guide LLM toward concise, "your X" format
+    # System prompt enforces constraints (9 words max, no quotes, must start with "your")
+    print("🤖 Generating email one-liner...")
+
+    response = openai_client.chat.completions.create(
+        model="gpt-4.1",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are an expert at generating concise, unique descriptions of companies. Generate ONLY a concise description (no greetings or extra text). Don't use generic adjectives like 'comprehensive', 'innovative', or 'powerful'. Keep it short and concise, no more than 9 words. DO NOT USE QUOTES. Only use English. You MUST start the response with 'your'.",
+            },
+            {
+                "role": "user",
+                "content": f"""The response will be inserted into this template: "{{response}}"
 
 Examples:
 Value prop: "Supercharge your investment team with AI-powered research"
@@ -103,39 +183,43 @@ Response: "your video-first approach to food delivery"
 
 Value prop: "{value_prop}"
 Response:""",
-                    },
-                ],
-            )
-
-            one_liner = (response.choices[0].message.content or "").strip()
+            },
+        ],
+    )
 
-            # Validate LLM response is usable (not empty, not generic placeholder)
-            print("🔍 Validating generated one-liner...")
-            if (
-                not one_liner
-                or one_liner.lower() == "null"
-                or one_liner.lower() == "undefined"
-                or one_liner.lower() == "your company"
-            ):
-                print(f'⚠️ LLM generated invalid or placeholder response: "{one_liner}"')
-                raise ValueError(
-                    f'No valid one-liner generated for {domain}. AI response: "{one_liner}"'
-                )
+    one_liner = (response.choices[0].message.content or "").strip()
 
-            print(f"✨ Generated one-liner for {domain}: {one_liner}")
+    # Validate LLM response is usable (not empty, not generic placeholder)
+    print("🔍 Validating generated one-liner...")
+    if (
+        not one_liner
+        or one_liner.lower() == "null"
+        or one_liner.lower() == "undefined"
+        or one_liner.lower() == "your company"
+    ):
+        print(f'⚠️ LLM generated invalid or placeholder response: "{one_liner}"')
+        raise ValueError(f'No valid one-liner generated. AI response: "{one_liner}"')
 
-            browser.close()
+    save_to_cache("one_liners", value_prop, one_liner)
+    return one_liner
 
-        client.sessions.end(id=session_id)
-        print("Session closed successfully")
-        return one_liner
 
+def generate_one_liner(domain: str) -> str:
+    """
+    Analyzes a website's landing page to generate a concise one-liner value proposition.
+    Extracts the value prop using Stagehand, then uses an LLM to format it into a short phrase starting with "your".
+    Both steps are cached, so repeat runs for the same domain skip the browser session and the LLM call.
+    """
+    try:
+        one_liner = format_one_liner(extract_value_prop(domain))
     except Exception as error:
         error_message = str(error) if isinstance(error, Exception) else error
         print(f"❌ Generation failed for {domain}: {error_message}")
-        client.sessions.end(id=session_id)
         raise
 
+    print(f"✨ Generated one-liner for {domain}: {one_liner}")
+    return one_liner
+
 
 def main():
     """